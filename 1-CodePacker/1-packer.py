@@ -1,23 +1,113 @@
+import io
 import os
+import re
+import gzip
+import json
+import stat
+import heapq
+import time
+import cProfile
+import contextlib
+import sqlite3
+import hashlib
+import argparse
+import threading
+from collections import deque
 import fnmatch
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# watch 模式可选依赖: 安装 watchdog 后使用 inotify 等系统事件，否则退回轮询
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# md.zst 输出格式可选依赖
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # ==============================================================================
 #                               👇 用户配置区域 👇
 # ==============================================================================
 
-# 1. 当前要运行的任务名称
+# 1. 当前要运行的任务名称 (命令行 -t 任务名 / --all 可覆盖，例如: python 1-packer.py -t paper_chapter3 -t paper_chapter4-1)
 CURRENT_TASK = "paper_chapter3-1" 
 
 # 2. 统一输出文件夹名称 (所有生成的 markdown 都会放在这里，自动创建)
 OUTPUT_DIR = "output"
 
-# 3. 全局配置与任务配置
+# 3. 增量缓存文件夹名称 (与 OUTPUT_DIR 并列，保存每个任务的文件状态清单)
+CACHE_DIR = ".packer_cache"
+
+# 4. 全局配置与任务配置
 GLOBAL_CONFIG = {
+  # 忽略规则支持 gitignore 风格: "/build" 锚定到根目录, "logs/" 仅匹配目录, "!keep.py" 取反重新包含
   "global_ignore": [
     "node_modules", ".git", "__pycache__", ".DS_Store", "generated",
     "__init__.py", ".next", "baselines", ".venv", "dist", "build", "*.pyc"
   ],
 
+  # 目录扫描线程数，任务中可单独覆盖。本地磁盘 (页缓存已热) 上多线程反而更慢，默认 1 单线程扫描；
+  # 项目放在 NFS/SMB 等网络盘上、每次 stat/scandir 都有往返延迟时再设为 8~16
+  "scan_workers": 1,
+
+  # 增量打包: 记录每个文件的 mtime/size/哈希，重复运行时只重新读取发生变化的文件
+  "incremental": True,
+
+  # 输出体积控制 (None 表示不限制): 单文件/全部文件的字节数与行数上限
+  "max_file_bytes": 1048576,
+  "max_file_lines": None,
+  "max_total_bytes": None,
+  "max_total_lines": None,
+  # 超出单文件字节上限时的处理方式: "truncate" 截断保留开头 / "skip" 整个跳过 (行数超限总是截断)
+  "oversize_policy": "truncate",
+  # 只读取文件开头几 KB 判断是否为二进制 / 压缩(minified)文件，命中则跳过
+  "skip_binary": True,
+  "skip_minified": True,
+  # 流式拷贝时每次读取的字符数
+  "stream_chunk_size": 65536,
+
+  # 跨任务、跨运行共享的片段缓存 (保存在 CACHE_DIR/sections.db 中，按最近使用淘汰) 及其容量上限
+  "section_cache": True,
+  "section_cache_max_mb": 256,
+  # 内容完全相同的文件只输出一次，后续副本写为指向首次出现位置的引用
+  "dedup": True,
+
+  # 并发读取: 线程池大小与预读窗口 (最多提前渲染多少个文件片段)。与 scan_workers 相同，
+  # 默认 1 顺序读取；网络盘上打开文件延迟高时设为 8~16 (2-benchmark.py read 可对比两种存储下的效果)
+  "read_workers": 1,
+  "read_ahead": 64,
+
+  # watch 模式: 轮询间隔与防抖时间 (秒)，连续保存时等待改动平息后再重建
+  "watch_interval": 0.1,
+  "watch_debounce": 0.05,
+
+  # Token 预算 (None 表示不限制): 按优先级挑选文件直到填满预算，适合直接投喂 LLM 上下文窗口
+  "max_tokens": None,
+  # paths 中显式列出的文件总是最先纳入，其余文件的排序方式: "recent" 最近修改优先 / "small" 小文件优先
+  "token_priority": "recent",
+
+  # 目录树裁剪 (None 表示不限制): 单个目录最多显示的条目数 (其余折叠为 "… N more entries") 与最大显示深度
+  "tree_max_entries": None,
+  "tree_max_depth": None,
+
+  # 输出格式 (一次遍历同时写出): "md" 普通 markdown / "md.gz" gzip 压缩 / "md.zst" zstd 压缩 (需安装 zstandard)
+  #                            "jsonl" 每个文件一条记录 / "shards" 在文件边界处切分为多个分片并附带索引文件
+  "output_formats": ["md"],
+  # 分片上限 (按 token 或字节，都设置时任一超出即切分到下一个分片)
+  "shard_max_tokens": 100000,
+  "shard_max_bytes": None,
+
+  # 性能剖析 (命令行 --profile / --cprofile): 打印各阶段耗时、读写字节数、stat/open 次数与最慢的文件和目录，
+  # 同时写出 <输出文件名>.profile.json；profile_cprofile 额外保存主线程的 cProfile 数据 (<输出文件名>.prof)
+  "profile": False,
+  "profile_top": 10,
+  "profile_cprofile": False,
+
   "tasks": {
     "default": {
       "description": "默认任务",
@@ -118,10 +208,688 @@ EXT_TO_LANG = {
     '.sql': 'sql', '.sh': 'bash', '.yaml': 'yaml', '.tsx': 'typescript'
 }
 
+# Windows 等大小写不敏感的平台上, 忽略规则同样按不区分大小写处理 (与 fnmatch 行为保持一致)
+CASE_INSENSITIVE = os.path.normcase('A') == 'a'
+
+# 二进制 / minified 检测时读取的文件头字节数
+SNIFF_BYTES = 8192
+# 平均行长超过该值视为 minified 文件
+MINIFIED_LINE_LENGTH = 300
+# token 估算用的字节类别: 字母数字约 4 字节一个 token，ASCII 标点各算一个，
+# 非 ASCII 字节 (CJK 每字 3 字节) 约 2 字节一个，换行与每 4 个空格的缩进各算一个
+ALNUM_BYTES = bytes(range(48, 58)) + bytes(range(65, 91)) + bytes(range(97, 123))
+PUNCT_BYTES = bytes(c for c in range(33, 127) if c not in ALNUM_BYTES)
+HIGH_BYTES = bytes(range(128, 256))
+# 不超过该大小的文件会把渲染好的片段存入增量缓存 (更大的文件每次流式拷贝，避免缓存占用内存)
+CACHE_SECTION_MAX_BYTES = 262144
+
+# ================= 忽略规则匹配 =================
+
+def translate_path_glob(pattern):
+    """ 将 gitignore 风格的路径通配符转换为正则: * 与 ? 不跨越 "/", ** 可跨越多级目录 """
+    i, n = 0, len(pattern)
+    res = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i):
+                i += 2
+                if i < n and pattern[i] == '/':
+                    # "**/" 匹配零到多级目录
+                    i += 1
+                    res.append('(?:.*/)?')
+                else:
+                    res.append('.*')
+                continue
+            res.append('[^/]*')
+        elif c == '?':
+            res.append('[^/]')
+        elif c == '[':
+            j = i + 1
+            if j < n and pattern[j] in '!^': j += 1
+            if j < n and pattern[j] == ']': j += 1
+            j = pattern.find(']', j)
+            if j == -1:
+                res.append('\\[')
+            else:
+                stuff = pattern[i + 1:j].replace('\\', '\\\\')
+                if stuff[0] == '!': stuff = '^' + stuff[1:]
+                res.append(f'[{stuff}]')
+                i = j + 1
+                continue
+        else:
+            res.append(re.escape(c))
+        i += 1
+    return '(?s:' + ''.join(res) + r')\Z'
+
+class _PatternGroup:
+    """ 一组同向 (全部忽略或全部取反) 的规则: 字面量名称集合 + 合并后的预编译正则 """
+
+    def __init__(self):
+        self.names, self.dir_names = set(), set()
+        self.name_globs, self.dir_name_globs = [], []
+        self.path_globs, self.dir_path_globs = [], []
+
+    def add(self, pattern, dir_only):
+        if pattern.startswith('/'):
+            # 前导 "/": 锚定到项目根目录
+            (self.dir_path_globs if dir_only else self.path_globs).append(translate_path_glob(pattern[1:]))
+        elif '/' in pattern:
+            # 中间含 "/": 与 gitignore 一致, 按相对项目根目录的路径匹配
+            (self.dir_path_globs if dir_only else self.path_globs).append(translate_path_glob(pattern))
+        elif any(ch in pattern for ch in '*?['):
+            (self.dir_name_globs if dir_only else self.name_globs).append(fnmatch.translate(pattern))
+        else:
+            if CASE_INSENSITIVE: pattern = pattern.lower()
+            (self.dir_names if dir_only else self.names).add(pattern)
+
+    def compile(self):
+        flags = re.IGNORECASE if CASE_INSENSITIVE else 0
+        def _combine(globs):
+            return re.compile('|'.join(globs), flags).match if globs else None
+        self.name_re = _combine(self.name_globs)
+        self.dir_name_re = _combine(self.dir_name_globs)
+        self.path_re = _combine(self.path_globs)
+        self.dir_path_re = _combine(self.dir_path_globs)
+        return self
+
+    def hit(self, name, path, is_dir):
+        key = name.lower() if CASE_INSENSITIVE else name
+        if key in self.names: return True
+        if self.name_re and self.name_re(name): return True
+        if self.path_re and self.path_re(path): return True
+        if is_dir:
+            if key in self.dir_names: return True
+            if self.dir_name_re and self.dir_name_re(name): return True
+            if self.dir_path_re and self.dir_path_re(path): return True
+        return False
+
+class IgnoreMatcher:
+    """
+    将忽略规则一次性编译为组合匹配器, 替代逐条 fnmatch 的循环。
+    规则语法 (gitignore 风格):
+      - 不含 "/" 的规则匹配任意层级的文件/目录名, 例如 "node_modules"、"*.pyc"
+      - 前导 "/" 锚定到项目根目录, 例如 "/build"; 中间含 "/" 的规则同样按相对路径匹配
+      - 末尾 "/" 表示只匹配目录, 例如 "logs/"
+      - 前导 "!" 表示取反 (重新包含), 多条规则冲突时以最后命中的为准
+    """
+
+    def __init__(self, patterns):
+        # 以取反规则为界切成若干段, 匹配时从后往前找第一个命中的段, 即可实现 "最后命中者生效"
+        self.segments = []
+        for raw in patterns:
+            pattern = raw.strip()
+            negate = pattern.startswith('!')
+            if negate: pattern = pattern[1:]
+            elif pattern.startswith('\\!'): pattern = pattern[1:]
+            dir_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            if not pattern: continue
+
+            if not self.segments or self.segments[-1][0] != negate:
+                self.segments.append((negate, _PatternGroup()))
+            self.segments[-1][1].add(pattern, dir_only)
+
+        self.segments = [(negate, group.compile()) for negate, group in self.segments]
+
+    def match(self, rel_path, is_dir=False):
+        if os.sep != '/': rel_path = rel_path.replace(os.sep, '/')
+        if rel_path.startswith('./'): rel_path = rel_path[2:]
+        name = rel_path.rpartition('/')[2]
+        for negate, group in reversed(self.segments):
+            if group.hit(name, rel_path, is_dir):
+                return not negate
+        return False
+
+# ================= 流式输出辅助 =================
+
+def sniff_skip_reason(abs_path, skip_binary=True, skip_minified=True):
+    """ 只读取文件开头 SNIFF_BYTES 字节，判断是否应跳过 (二进制 / minified)，返回原因或 None """
+    if not (skip_binary or skip_minified): return None
+    with open(abs_path, 'rb') as f:
+        sample = f.read(SNIFF_BYTES)
+    if skip_binary and b'\0' in sample:
+        return "二进制文件"
+    if skip_minified and len(sample) >= 1024 and len(sample) / (sample.count(b'\n') + 1) > MINIFIED_LINE_LENGTH:
+        return "疑似 minified / 单行超长文件"
+    return None
+
+def clip_text(text, max_bytes=None, max_lines=None):
+    """
+    按字节数/行数上限截断文本，返回 (文本, UTF-8 字节数, 换行符个数, 是否被截断)。
+    末尾没有换行的半行也占一行: 分块读取时它要么是文件最后一行，要么在下一块中接着写完。
+    """
+    clipped = False
+    if max_lines is not None and text.count('\n') + (text[-1:] not in ('', '\n')) > max_lines:
+        pos = -1
+        for _ in range(max_lines):
+            pos = text.find('\n', pos + 1)
+        text, clipped = text[:pos + 1], True
+    data = text.encode('utf-8')
+    if max_bytes is not None and len(data) > max_bytes:
+        data, clipped = data[:max_bytes], True
+        text = data.decode('utf-8', 'ignore')
+        data = text.encode('utf-8')
+    return text, len(data), text.count('\n'), clipped
+
+def estimate_tokens(text):
+    """
+    离线快速估算 token 数，无需下载分词器: 用 bytes.translate 删除某类字节后比较长度，
+    各类字节计数都在 C 层整块完成，不逐字符进入 Python 循环
+    """
+    data = text.encode('utf-8')
+    n = len(data)
+    alnum = n - len(data.translate(None, ALNUM_BYTES))
+    punct = n - len(data.translate(None, PUNCT_BYTES))
+    high = n - len(data.translate(None, HIGH_BYTES))
+    return int(alnum / 4 + punct + high / 2 + data.count(b'\n') + data.count(b'    ') + 0.5)
+
+# ================= 目录树渲染 =================
+
+def iter_tree_lines(paths, sep=os.sep, max_entries=None, max_depth=None):
+    """
+    将路径列表渲染为树形文本行 (不含根节点 "."): 先按路径分段排序展开为先序节点序列，
+    再统计每个目录的子节点数后逐行输出。全程迭代、不建嵌套字典，耗时与节点数成线性。
+    max_entries: 单个目录最多显示的子节点数；max_depth: 最多显示的层数。
+    """
+    # 1. 展开为先序节点序列，缺失的中间目录在此补齐，重复路径自然去掉；同时记录每个节点的父节点、
+    #    在兄弟中的序号以及子节点数 (节点编号从 1 开始，0 代表虚拟根)。
+    #    把分隔符换成最小的字符 \0 后按字符串排序，结果与逐段比较相同，但比对列表排序快得多
+    depths, names, parents, ordinals = [], [], [], []
+    child_counts = [0]
+    stack, prev_dir, prev_name = [], None, None     # stack[d]: 第 d 层最近一个节点的编号
+    for key in sorted(p.replace(sep, '\0') for p in paths):
+        parent_dir, _, name = key.rpartition('\0')
+        if parent_dir == prev_dir:
+            # 常见情况: 与上一个路径同目录，只差最后一段 (或完全重复)，无需拆分整个路径
+            if name == prev_name: continue
+            parent = stack[-2] if len(stack) > 1 else 0
+            depths.append(len(stack) - 1)
+            names.append(name)
+            parents.append(parent)
+            ordinals.append(child_counts[parent])
+            child_counts[parent] += 1
+            child_counts.append(0)
+            stack[-1] = len(depths)
+            prev_name = name
+            continue
+
+        parts = key.split('\0')
+        prev_parts = prev_dir.split('\0') + [prev_name] if prev_dir else ([prev_name] if prev_name is not None else [])
+        common = 0
+        for x, y in zip(prev_parts, parts):
+            if x != y: break
+            common += 1
+        for depth in range(common, len(parts)):
+            del stack[depth:]
+            parent = stack[-1] if stack else 0
+            depths.append(depth)
+            names.append(parts[depth])
+            parents.append(parent)
+            ordinals.append(child_counts[parent])
+            child_counts[parent] += 1
+            child_counts.append(0)
+            stack.append(len(depths))
+        prev_dir, prev_name = parent_dir, name
+
+    # 2. 输出: prefixes[d] 是第 d 层节点的缩进前缀 (由父节点前缀拼接而来)；被裁剪节点的整棵子树直接跳过
+    prefixes = [""]
+    skip_below = None
+    for depth, name, parent, ordinal in zip(depths, names, parents, ordinals):
+        if skip_below is not None:
+            if depth > skip_below: continue
+            skip_below = None
+        del prefixes[depth + 1:]
+        prefix = prefixes[depth]
+        count = child_counts[parent]
+        if max_depth is not None and depth >= max_depth:
+            yield f"{prefix}└── … {count:,} {'entry' if count == 1 else 'entries'}"
+            skip_below = depth - 1
+            continue
+        if max_entries is not None and ordinal >= max_entries:
+            yield f"{prefix}└── … {count - ordinal:,} more entries"
+            skip_below = depth - 1
+            continue
+        is_last = ordinal == count - 1
+        yield f"{prefix}{'└── ' if is_last else '├── '}{name}"
+        prefixes.append(prefix + ("    " if is_last else "│   "))
+
+# ================= 目录扫描与批量共享 =================
+
+def list_dir(abs_dir):
+    """ 用 os.scandir 列出目录，复用 DirEntry 缓存的类型信息，返回 [(名称, 路径, 是否目录, 是否链接)] """
+    listing = []
+    with os.scandir(abs_dir) as it:
+        for entry in it:
+            try:
+                listing.append((entry.name, entry.path, entry.is_dir(), entry.is_symlink()))
+            except OSError:
+                continue
+    return listing
+
+class SharedContext:
+    """
+    批量打包时，同一项目根目录下的多个任务共享的状态:
+    目录列表只 scandir 一次 (各任务再按自己的忽略规则/后缀过滤)，文件片段只读取一次。
+    """
+
+    def __init__(self):
+        self.listings = {}
+        self.sections = {}
+        self.lock = threading.Lock()
+
+    def list_dir(self, abs_dir):
+        listing = self.listings.get(abs_dir)
+        if listing is None:
+            listing = list_dir(abs_dir)
+            with self.lock:
+                self.listings[abs_dir] = listing
+        return listing
+
+    def get_section(self, abs_path, st):
+        entry = self.sections.get(abs_path)
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            return entry
+        return None
+
+    def put_section(self, abs_path, entry):
+        with self.lock:
+            self.sections[abs_path] = entry
+
+# ================= 增量缓存 =================
+
+def text_digest(abs_path, chunk_size=65536):
+    """ 按块读取文件计算内容哈希 (与片段缓存中的 hash 口径一致: 统一换行后的 UTF-8 文本) """
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(abs_path, 'r', encoding='utf-8') as src_file:
+        while True:
+            chunk = src_file.read(chunk_size)
+            if not chunk: break
+            hasher.update(chunk.encode('utf-8'))
+    return hasher.hexdigest()
+
+class SectionCache:
+    """
+    跨任务、跨运行共享的持久化片段缓存 (单个 SQLite 文件)，按总字节数限制容量，超出时淘汰最久未使用的条目。
+    以 (绝对路径, 相对路径, mtime, size) 为键，命中时无需读取源文件，
+    同一个文件出现在多个任务中 (如 utils/preprocess_etbert_style.py) 时只需读取一次。
+    新条目先序列化后暂存在内存中，累计超过 BATCH_BYTES 就写入一批，峰值内存不随项目大小增长；
+    访问时间的更新与容量淘汰在 flush() 时一次完成。
+    """
+    BATCH_BYTES = 4 * 1024 * 1024
+
+    def __init__(self, db_path, max_bytes):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.pending = {}           # key -> 序列化后的条目
+        self.pending_bytes = 0
+        self.touched = set()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS sections ("
+                          "key TEXT PRIMARY KEY, entry TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self.conn.commit()
+
+    @staticmethod
+    def key(abs_path, rel_path, st):
+        raw = f"{abs_path}\0{rel_path}\0{st.st_mtime_ns}\0{st.st_size}".encode('utf-8')
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    def get(self, abs_path, rel_path, st):
+        key = self.key(abs_path, rel_path, st)
+        with self.lock:
+            data = self.pending.get(key)
+            if data is None:
+                row = self.conn.execute("SELECT entry FROM sections WHERE key = ?", (key,)).fetchone()
+                if row is None: return None
+                data = row[0]
+                self.touched.add(key)
+                self.hits += 1
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def put(self, abs_path, rel_path, st, entry):
+        data = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+        with self.lock:
+            self.pending[self.key(abs_path, rel_path, st)] = data
+            self.pending_bytes += len(data)
+            if self.pending_bytes >= self.BATCH_BYTES:
+                with self.conn: self._write_pending(time.time())
+
+    def _write_pending(self, now):
+        """ 把暂存的新条目写入数据库 (调用方持有锁并负责提交事务) """
+        self.conn.executemany("INSERT OR REPLACE INTO sections VALUES (?, ?, ?, ?)",
+                              [(key, data, len(data.encode('utf-8')), now) for key, data in self.pending.items()])
+        self.pending.clear()
+        self.pending_bytes = 0
+
+    def flush(self):
+        """ 写入剩余的新条目、更新访问时间，并在超出容量时按最近使用时间从旧到新淘汰到上限的 90% """
+        with self.lock:
+            if not (self.pending or self.touched): return
+            now = time.time()
+            with self.conn:
+                self._write_pending(now)
+                self.conn.executemany("UPDATE sections SET last_used = ? WHERE key = ?",
+                                      [(now, key) for key in self.touched])
+                total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM sections").fetchone()[0]
+                if total > self.max_bytes:
+                    excess = total - self.max_bytes * 0.9
+                    for key, size in self.conn.execute("SELECT key, size FROM sections ORDER BY last_used").fetchall():
+                        self.conn.execute("DELETE FROM sections WHERE key = ?", (key,))
+                        excess -= size
+                        if excess <= 0: break
+            self.touched.clear()
+
+_section_cache = None
+_section_cache_lock = threading.Lock()
+
+def get_section_cache():
+    """ 进程内所有任务共用同一个片段缓存实例 """
+    global _section_cache
+    with _section_cache_lock:
+        if _section_cache is None:
+            max_bytes = int(GLOBAL_CONFIG.get('section_cache_max_mb', 256) * 1024 * 1024)
+            _section_cache = SectionCache(os.path.join(SCRIPT_DIR, CACHE_DIR, 'sections.db'), max_bytes)
+        return _section_cache
+
+class FileStateCache:
+    """
+    任务级文件状态清单: 记录每个文件的 mtime、size、内容哈希、行数及 Token 数。
+    渲染好的 markdown 片段只保存一份: 启用片段缓存时存在 sections.db 中，清单按需去查；
+    关闭片段缓存时才写在清单里。重复打包时只需 stat 文件，状态未变化的文件直接拼接缓存片段，无需重新读取。
+    """
+    VERSION = 3
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.files = {}
+        self.dirty = False
+        # 并发读取时多个线程会同时查询/写入清单
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.files = data.get('files', {})
+        except (OSError, ValueError):
+            self.files = {}
+
+    def peek(self, rel_path, st):
+        """ 文件状态未变化时返回缓存记录 (不计入命中统计) """
+        entry = self.files.get(rel_path)
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            return entry
+        return None
+
+    def count(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def store(self, rel_path, entry):
+        with self.lock:
+            self.files[rel_path] = entry
+            self.dirty = True
+
+    def set_tokens(self, rel_path, st, tokens):
+        entry = self.peek(rel_path, st)
+        if entry and entry.get('tokens') != tokens:
+            entry['tokens'] = tokens
+            self.dirty = True
+
+    def prune(self, keep_paths):
+        """ 移除已不在本次打包范围内的文件记录 """
+        stale = self.files.keys() - set(keep_paths)
+        for rel_path in stale:
+            del self.files[rel_path]
+        if stale: self.dirty = True
+
+    def save(self):
+        if not self.dirty: return
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        # 先写临时文件再原子替换，避免中途中断留下损坏的清单
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'files': self.files}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.manifest_path)
+        self.dirty = False
+
+# ================= 性能剖析 =================
+
+class PackerProfile:
+    """
+    打包过程的计时与计数: 阶段耗时、读写字节数、stat/open 等系统调用次数，以及最慢的若干文件与目录。
+    扫描与读取在线程池中进行，所以 ignore / read 两项是各线程累计耗时，可能大于实际经过的时间。
+    """
+    PHASE_NAMES = {
+        'scan': '扫描目录', 'ignore': '  其中忽略匹配 (累计)', 'tokens': 'Token 预算', 'tree': '构建目录树',
+        'read': '读取文件 (累计)', 'write': '读取并写出内容', 'finalize': '保存缓存',
+    }
+
+    def __init__(self, top_n=10, cprofile=False):
+        self.top_n = top_n
+        self.phases = {}
+        self.counters = {'stat': 0, 'open': 0, 'scandir': 0, 'bytes_read': 0, 'bytes_written': 0}
+        self.slow_files = []    # 小顶堆: (耗时, 相对路径, 字节数)
+        self.slow_dirs = []     # 小顶堆: (耗时, 相对路径, 条目数)
+        self.lock = threading.Lock()
+        self.profiler = None
+        if cprofile:
+            # cProfile 只能剖析启用它的线程 (主线程)，工作线程中的读取只体现在 read/ignore 等计时中
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError as e:
+                print(f"⚠️  无法启用 cProfile: {e}")
+                self.profiler = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.counters[key] += n
+
+    def _push(self, heap, item):
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def record_file(self, rel_path, seconds, nbytes):
+        with self.lock:
+            self.phases['read'] = self.phases.get('read', 0.0) + seconds
+            self._push(self.slow_files, (seconds, rel_path, nbytes))
+
+    def record_dir(self, rel_dir, seconds, entries):
+        with self.lock:
+            self.counters['scandir'] += 1
+            self._push(self.slow_dirs, (seconds, rel_dir or '.', entries))
+
+    def ordered_phases(self):
+        """ 按流水线顺序列出阶段 (嵌套计时的 ignore 先于 scan 结束，不能按插入顺序) """
+        names = [n for n in self.PHASE_NAMES if n in self.phases]
+        return [(n, self.phases[n]) for n in names + [n for n in self.phases if n not in self.PHASE_NAMES]]
+
+    def to_dict(self):
+        return {
+            'phases_ms': {k: round(v * 1000, 3) for k, v in self.ordered_phases()},
+            'counters': dict(self.counters),
+            'slowest_files': [{'path': p, 'ms': round(t * 1000, 3), 'bytes': n}
+                              for t, p, n in sorted(self.slow_files, reverse=True)],
+            'slowest_dirs': [{'path': p, 'ms': round(t * 1000, 3), 'entries': n}
+                             for t, p, n in sorted(self.slow_dirs, reverse=True)],
+        }
+
+    def report(self, stem):
+        """ 打印摘要，并写出 <stem>.profile.json (及 <stem>.prof) """
+        if self.profiler:
+            self.profiler.disable()
+            self.profiler.dump_stats(stem + '.prof')
+        c = self.counters
+        print("⏱️  性能剖析:")
+        for name, seconds in self.ordered_phases():
+            print(f"   - {self.PHASE_NAMES.get(name, name)}: {seconds * 1000:.1f} ms")
+        print(f"   - 读取 {c['bytes_read'] / 1048576:.2f} MB / 写出 {c['bytes_written'] / 1048576:.2f} MB; "
+              f"scandir {c['scandir']} 次, stat {c['stat']} 次, open {c['open']} 次")
+        if self.slow_files:
+            print("   - 最慢的文件: " + ", ".join(f"{p} ({t * 1000:.1f} ms)" for t, p, _ in sorted(self.slow_files, reverse=True)[:5]))
+        if self.slow_dirs:
+            print("   - 最慢的目录: " + ", ".join(f"{p} ({t * 1000:.1f} ms)" for t, p, _ in sorted(self.slow_dirs, reverse=True)[:5]))
+        with open(stem + '.profile.json', 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        print(f"   📄 详细数据: {stem}.profile.json" + (f", {stem}.prof" if self.profiler else ""))
+
+# ================= 输出格式 =================
+
+class BundleOutput:
+    """
+    一次遍历同时写出多种格式: 完整 markdown (可 gzip/zstd 压缩)、按文件边界切分的分片 + 索引、每文件一条记录的 JSONL。
+    调用方像普通文件一样顺序 write，文件片段前后用 begin_file / end_file 标出边界。
+    """
+    def __init__(self, output_dir, filename, task_name, formats=('md',), shard_max_tokens=None, shard_max_bytes=None):
+        self.task_name = task_name
+        self.stem = os.path.join(output_dir, os.path.splitext(filename)[0])
+        self.streams, self.paths = [], []
+        for fmt in formats:
+            path = os.path.join(output_dir, filename)
+            if fmt == 'md':
+                stream = open(path, 'w', encoding='utf-8')
+            elif fmt == 'md.gz':
+                path += '.gz'
+                stream = gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+            elif fmt == 'md.zst':
+                if zstandard is None:
+                    print("⚠️  未安装 zstandard (pip install zstandard)，跳过 md.zst 输出")
+                    continue
+                path += '.zst'
+                writer = zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'))
+                stream = io.TextIOWrapper(writer, encoding='utf-8')
+            elif fmt in ('jsonl', 'shards'):
+                continue
+            else:
+                print(f"⚠️  未知的输出格式: {fmt}，已忽略")
+                continue
+            self.streams.append(stream)
+            self.paths.append(path)
+
+        self.jsonl = None
+        if 'jsonl' in formats:
+            self.paths.append(self.stem + '.jsonl')
+            self.jsonl = open(self.paths[-1], 'w', encoding='utf-8')
+        self.preamble = []      # 第一个文件之前的内容 (标题与目录树)，作为 JSONL 的首条记录
+        self.in_file = False
+
+        self.sharding = 'shards' in formats
+        self.shard_max_tokens = shard_max_tokens
+        self.shard_max_bytes = shard_max_bytes
+        if self.sharding and not (shard_max_tokens or shard_max_bytes):
+            self.shard_max_tokens = 100000
+        self.shard = None
+        self.shards = []        # 索引: 每个分片的文件名、体积与包含的文件
+
+    # ---------- 分片 ----------
+    def _open_shard(self):
+        if self.shard: self.shard.close()
+        part = len(self.shards) + 1
+        path = f"{self.stem}.part{part:03d}.md"
+        self.shard = open(path, 'w', encoding='utf-8')
+        self.shards.append({"file": os.path.basename(path), "bytes": 0, "tokens": 0, "files": []})
+        if part > 1:
+            self._write_shard(f"# Project Context Bundle (Part {part})\n"
+                              f"> Task: {self.task_name} | 接上一分片 {self.shards[-2]['file']}\n\n")
+
+    def _write_shard(self, text):
+        if self.shard is None: self._open_shard()
+        self.shard.write(text)
+        info = self.shards[-1]
+        info["bytes"] += len(text.encode('utf-8'))
+        if self.shard_max_tokens: info["tokens"] += estimate_tokens(text)
+
+    # ---------- 写入接口 ----------
+    def write(self, text):
+        for stream in self.streams:
+            stream.write(text)
+        if self.sharding:
+            self._write_shard(text)
+        if self.jsonl:
+            if self.in_file:
+                # 记录的 markdown 字段边写边转义，大文件也无需整段留在内存里
+                self.jsonl.write(json.dumps(text, ensure_ascii=False)[1:-1])
+            elif self.preamble is not None:
+                self.preamble.append(text)
+
+    def begin_file(self, rel_path, expected_bytes=0):
+        """ 开始一个文件片段: 当前分片放不下时先切换到新分片 (单个文件不会被拆开) """
+        if self.sharding and self.shard and self.shards[-1]["files"]:
+            info = self.shards[-1]
+            if ((self.shard_max_bytes and info["bytes"] + expected_bytes > self.shard_max_bytes) or
+                    (self.shard_max_tokens and info["tokens"] + expected_bytes // 4 > self.shard_max_tokens)):
+                self._open_shard()
+        if self.sharding:
+            if self.shard is None: self._open_shard()
+            self.shards[-1]["files"].append(rel_path)
+        if self.jsonl:
+            self._flush_preamble()
+            self.jsonl.write(f'{{"type": "file", "path": {json.dumps(rel_path, ensure_ascii=False)}, "markdown": "')
+        self.in_file = True
+
+    def end_file(self, nbytes=0, nlines=0, digest=None):
+        if self.jsonl:
+            self.jsonl.write(f'", "bytes": {nbytes}, "lines": {nlines}, "hash": {json.dumps(digest)}}}\n')
+        self.in_file = False
+
+    def _flush_preamble(self):
+        if self.preamble is None: return
+        record = {"type": "header", "task": self.task_name, "markdown": "".join(self.preamble)}
+        self.jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.preamble = None
+
+    def close(self):
+        for stream in self.streams:
+            stream.close()
+        if self.jsonl:
+            self._flush_preamble()
+            self.jsonl.close()
+        if self.sharding:
+            if self.shard is None: self._open_shard()
+            self.shard.close()
+            index_path = self.stem + '.index.json'
+            with open(index_path, 'w', encoding='utf-8') as f:
+                json.dump({"task": self.task_name, "parts": self.shards}, f, ensure_ascii=False, indent=2)
+            self.paths.append(index_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 # ================= 核心类 =================
 
 class ContextPacker:
-    def __init__(self, task_name):
+    def __init__(self, task_name, shared=None):
         self.config = GLOBAL_CONFIG
         self.task_name = task_name
         self.task_config = self.get_task_config(task_name)
@@ -133,13 +901,48 @@ class ContextPacker:
         
         print(f"📂 任务 [{task_name}] 根目录定位为: {self.project_root}")
 
+        # 缓存目录里保存着所有文件的内容，项目根目录包含本脚本目录时不能被打包；放在最后，取反规则也不会重新包含它
         self.ignore_patterns = self.config.get('global_ignore', []) + \
-                               self.task_config.get('ignore', [])
+                               self.task_config.get('ignore', []) + [CACHE_DIR + "/"]
+        self.ignore_matcher = IgnoreMatcher(self.ignore_patterns)
         
         self.target_extensions = set(self.task_config.get('extensions', []))
         
-        self.collected_files = [] 
+        self.scanned_files = []     # 扫描得到的全部内容文件 (Token 预算每次都从这里重新挑选)
+        self.collected_files = []   # 本次实际打包的文件
         self.structure_files = [] 
+        # 目录树文本只在重新扫描后才需要重建
+        self.tree_text = None
+        # paths 中显式列出的内容文件 (Token 预算下优先纳入)
+        self.explicit_files = set()
+        # Token 预算下未能纳入的文件，以及每个文件的估算 token 数
+        self.dropped_files = []
+        self.file_tokens = {}
+
+        # 批量模式下与同根目录的其他任务共享目录列表和文件片段
+        self.shared = shared
+        self.list_dir = shared.list_dir if shared else list_dir
+        self.shared_hits = 0
+
+        self.state_cache = None
+        if self.get_option('incremental', True):
+            manifest_path = os.path.join(SCRIPT_DIR, CACHE_DIR, f"{task_name}.manifest.json")
+            self.state_cache = FileStateCache(manifest_path)
+
+        self.section_cache = get_section_cache() if self.get_option('section_cache', True) else None
+        self.section_cache_hits = 0
+
+        # 内容去重: 哈希 -> 首次出现的相对路径；以及已流式输出的大文件尺寸 (尺寸相同时才需要预先计算哈希)
+        self.seen_hashes = {}
+        self.seen_sizes = set()
+        self.dedup_count = 0
+
+        # 已写入输出的内容字节数/行数，用于执行总预算
+        self.total_bytes = 0
+        self.total_lines = 0
+        self.total_tokens = 0
+
+        self.profile = self.new_profile()
 
     def get_task_config(self, task_name):
         tasks = self.config.get('tasks', {})
@@ -149,16 +952,88 @@ class ContextPacker:
             exit(1)
         return tasks[task_name]
 
-    def is_ignored(self, rel_path):
-        name = os.path.basename(rel_path)
-        for pattern in self.ignore_patterns:
-            if fnmatch.fnmatch(name, pattern):
-                return True
-            if fnmatch.fnmatch(rel_path, pattern):
-                return True
-        return False
+    def is_ignored(self, rel_path, is_dir=False):
+        if not self.profile:
+            return self.ignore_matcher.match(rel_path, is_dir)
+        start = time.perf_counter()
+        ignored = self.ignore_matcher.match(rel_path, is_dir)
+        self.profile.add('ignore', time.perf_counter() - start)
+        return ignored
+
+    def timed(self, phase):
+        return self.profile.phase(phase) if self.profile else contextlib.nullcontext()
+
+    def new_profile(self):
+        """ 开启 profile 时为本次运行创建新的计时器 (watch 模式下每次重建各自计时) """
+        if not self.get_option('profile', False): return None
+        return PackerProfile(self.get_option('profile_top', 10), self.get_option('profile_cprofile', False))
+
+    def get_option(self, key, default=None):
+        # 优先级: 任务配置 > 全局配置 > 默认值
+        return self.task_config.get(key, self.config.get(key, default))
+
+    def _scan_dir(self, abs_dir, rel_dir):
+        """ 扫描单个目录 (不递归)，返回 (结构节点, 内容文件, 待扫描子目录) """
+        structure, contents, subdirs = [], [], []
+        prefix = rel_dir + os.sep if rel_dir else ""
+        start = time.perf_counter() if self.profile else 0
+        try:
+            listing = self.list_dir(abs_dir)
+        except OSError as e:
+            print(f"⚠️  警告: 无法读取目录 {rel_dir or '.'}: {e}")
+            return structure, contents, subdirs
+
+        for name, path, is_dir, is_symlink in listing:
+            # 直接拼接字符串得到相对路径
+            rel_path = prefix + name
+            if is_dir:
+                # 与 os.walk 默认行为一致: 不进入符号链接目录
+                if is_symlink or self.is_ignored(rel_path, is_dir=True):
+                    continue
+                # 显式将文件夹加入结构树，即使其下没有目标代码文件也会保留
+                structure.append(rel_path)
+                subdirs.append((path, rel_path))
+            else:
+                if self.is_ignored(rel_path):
+                    continue
+                # 只要文件不被忽略，就加入结构树（不管是不是 .py 代码）
+                structure.append(rel_path)
+                if os.path.splitext(name)[1] in self.target_extensions:
+                    contents.append(rel_path)
+        if self.profile:
+            self.profile.record_dir(rel_dir, time.perf_counter() - start, len(listing))
+        return structure, contents, subdirs
+
+    def _walk_dirs(self, roots):
+        """ 遍历多个目录树: 每个目录作为独立任务投递到线程池，发现子目录后继续投递 """
+        structure, contents = [], []
+        workers = self.get_option('scan_workers', 1)
+
+        if workers <= 1:
+            stack = list(roots)
+            while stack:
+                s, c, subdirs = self._scan_dir(*stack.pop())
+                structure.extend(s)
+                contents.extend(c)
+                stack.extend(subdirs)
+            return structure, contents
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {pool.submit(self._scan_dir, abs_dir, rel_dir) for abs_dir, rel_dir in roots}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    s, c, subdirs = future.result()
+                    structure.extend(s)
+                    contents.extend(c)
+                    pending.update(pool.submit(self._scan_dir, abs_dir, rel_dir) for abs_dir, rel_dir in subdirs)
+        return structure, contents
 
     def scan_files(self):
+        with self.timed('scan'):
+            self._scan_files()
+
+    def _scan_files(self):
         paths = self.task_config.get('paths', [])
         if not paths:
             print(f"👉 检测到 paths 配置为空，将扫描整个项目根目录...")
@@ -166,51 +1041,41 @@ class ContextPacker:
 
         content_file_set = set()
         structure_file_set = set()
+        dir_roots = {}
+        self.explicit_files = set()
+        self.dropped_files = []
+        self.tree_text = None
 
         print(f"🔍 正在扫描文件...")
 
         for p in paths:
-            full_path = os.path.join(self.project_root, p)
-            if not os.path.exists(full_path):
+            full_path = os.path.normpath(os.path.join(self.project_root, p))
+            if self.profile: self.profile.count('stat')
+            try:
+                st = os.stat(full_path)
+            except OSError:
                 print(f"⚠️  警告: 路径不存在: {p}")
                 continue
 
-            if os.path.isfile(full_path):
-                rel_path = os.path.relpath(full_path, self.project_root)
-                if not self.is_ignored(rel_path):
+            rel_path = os.path.relpath(full_path, self.project_root)
+            if stat.S_ISDIR(st.st_mode):
+                if rel_path != "." and not self.is_ignored(rel_path, is_dir=True):
                     structure_file_set.add(rel_path)
-                    _, ext = os.path.splitext(rel_path)
-                    if ext in self.target_extensions:
-                        content_file_set.add(rel_path)
-            
-            elif os.path.isdir(full_path):
-                for root, dirs, files in os.walk(full_path):
-                    rel_root = os.path.relpath(root, self.project_root)
-                    
-                    # 【新增修复逻辑 1】: 显式将当前遍历到的文件夹加入结构树
-                    # 这样即使文件夹下没有文件，或者没有目标代码文件，目录结构也会保留
-                    if rel_root != "." and not self.is_ignored(rel_root):
-                        structure_file_set.add(rel_root)
-
-                    # 过滤忽略的文件夹，防止递归进去
-                    dirs[:] = [d for d in dirs if not self.is_ignored(os.path.join(rel_root, d))]
-                    
-                    for file in files:
-                        abs_file_path = os.path.join(root, file)
-                        rel_file_path = os.path.relpath(abs_file_path, self.project_root)
-                        
-                        if self.is_ignored(rel_file_path):
-                            continue
-                        
-                        # 只要文件不被忽略，就加入结构树（不管是不是 .py 代码）
-                        structure_file_set.add(rel_file_path)
-                        
-                        # 检查后缀，如果符合才加入内容列表
-                        _, ext = os.path.splitext(file)
-                        if ext in self.target_extensions:
-                            content_file_set.add(rel_file_path)
-
-        self.collected_files = sorted(list(content_file_set))
+                dir_roots[full_path] = "" if rel_path == "." else rel_path
+            elif not self.is_ignored(rel_path):
+                structure_file_set.add(rel_path)
+                _, ext = os.path.splitext(rel_path)
+                if ext in self.target_extensions:
+                    content_file_set.add(rel_path)
+                    self.explicit_files.add(rel_path)
+
+        # 各个顶层目录及其子树在线程池中并行扫描
+        structure, contents = self._walk_dirs(list(dir_roots.items()))
+        structure_file_set.update(structure)
+        content_file_set.update(contents)
+
+        self.scanned_files = sorted(list(content_file_set))
+        self.collected_files = list(self.scanned_files)
         self.structure_files = sorted(list(structure_file_set))
         
         # 【新增修复逻辑 2】: 恢复打印找到的文件列表
@@ -224,77 +1089,618 @@ class ContextPacker:
         print(f"   - 目录树包含节点总数: {len(self.structure_files)} (包含目录和所有非忽略文件)")
         print(f"   - 实际打包内容文件数: {len(self.collected_files)}")
 
+    def estimate_file_tokens(self, rel_path, st):
+        """ 估算单个文件片段的 token 数: 优先使用增量缓存中的记录，否则按块读取估算 (遵守单文件上限) """
+        entry = self.state_cache.peek(rel_path, st) if self.state_cache else None
+        if entry and entry.get('tokens') is not None:
+            return entry['tokens']
+
+        abs_path = os.path.join(self.project_root, rel_path)
+        _, ext = os.path.splitext(rel_path)
+        tokens = estimate_tokens(f"### File: `{rel_path}`\n```{EXT_TO_LANG.get(ext, '')}\n```\n\n")
+        if sniff_skip_reason(abs_path, self.get_option('skip_binary', True), self.get_option('skip_minified', True)):
+            return tokens
+
+        max_bytes, max_lines = self.get_option('max_file_bytes'), self.get_option('max_file_lines')
+        chunk_size = self.get_option('stream_chunk_size', 65536)
+        nbytes = nlines = 0
+        with open(abs_path, 'r', encoding='utf-8') as src_file:
+            while True:
+                chunk = src_file.read(chunk_size)
+                if not chunk: break
+                chunk, chunk_bytes, chunk_lines, clipped = clip_text(
+                    chunk,
+                    None if max_bytes is None else max_bytes - nbytes,
+                    None if max_lines is None else max_lines - nlines)
+                tokens += estimate_tokens(chunk)
+                nbytes += chunk_bytes
+                nlines += chunk_lines
+                if clipped: break
+
+        if self.state_cache: self.state_cache.set_tokens(rel_path, st, tokens)
+        return tokens
+
+    def apply_token_budget(self, reserved_tokens=0):
+        """
+        按优先级挑选文件填满 max_tokens 预算: paths 中显式列出的文件最先，
+        其余按 token_priority (最近修改 / 小文件) 排序；放不下的文件跳过并继续尝试后面更小的文件。
+        """
+        max_tokens = self.get_option('max_tokens')
+        if not max_tokens: return
+
+        stats = {}
+        for rel_path in self.scanned_files:
+            try:
+                stats[rel_path] = os.stat(os.path.join(self.project_root, rel_path))
+            except OSError:
+                continue
+
+        priority = self.get_option('token_priority', 'recent')
+        if priority == 'small':
+            rank = lambda p: (p not in self.explicit_files, stats[p].st_size, p)
+        else:
+            rank = lambda p: (p not in self.explicit_files, -stats[p].st_mtime_ns, p)
+
+        selected, dropped = [], []
+        used = reserved_tokens
+        for rel_path in sorted(stats, key=rank):
+            try:
+                tokens = self.estimate_file_tokens(rel_path, stats[rel_path])
+            except Exception:
+                # 读取失败的文件只会输出一行错误信息
+                tokens = estimate_tokens(f"### File: `{rel_path}`\n> ⚠️ Error reading file\n\n")
+            self.file_tokens[rel_path] = tokens
+            if used + tokens <= max_tokens:
+                selected.append(rel_path)
+                used += tokens
+            else:
+                dropped.append(rel_path)
+
+        self.collected_files = selected
+        self.dropped_files = dropped
+        self.total_tokens = used
+
+        print(f"🧮 Token 预算: {used:,} / {max_tokens:,} (目录树等固定部分约 {reserved_tokens:,})")
+        print("-" * 40)
+        for idx, rel_path in enumerate(selected, 1):
+            print(f"   {idx}. {rel_path}  ~{self.file_tokens[rel_path]:,} tokens")
+        print("-" * 40)
+        if dropped:
+            print(f"   ⏭️  预算不足，跳过 {len(dropped)} 个文件: " + ", ".join(
+                f"{p} (~{self.file_tokens[p]:,})" for p in dropped[:10]) + (" ..." if len(dropped) > 10 else ""))
+
     def generate_tree_structure(self):
-        tree = {}
-        for path in self.structure_files:
-            parts = path.split(os.sep)
-            current = tree
-            for part in parts:
-                current = current.setdefault(part, {})
-        
-        lines = []
-        def _build_tree_string(node, prefix=""):
-            keys = sorted(node.keys())
-            count = len(keys)
-            for i, key in enumerate(keys):
-                is_last = (i == count - 1)
-                connector = "└── " if is_last else "├── "
-                lines.append(f"{prefix}{connector}{key}")
-                children = node[key]
-                if children:
-                    extension = "    " if is_last else "│   "
-                    _build_tree_string(children, prefix + extension)
-
-        lines.append(".") 
-        _build_tree_string(tree)
+        lines = ["."]
+        lines.extend(iter_tree_lines(self.structure_files,
+                                     max_entries=self.get_option('tree_max_entries'),
+                                     max_depth=self.get_option('tree_max_depth')))
         return "\n".join(lines)
 
+    def remaining_budget(self):
+        """ 当前文件可用的 (字节, 行数) 上限: 取单文件上限与总预算剩余量中较小者, None 表示不限制 """
+        limits = []
+        for file_key, total_key, used in (('max_file_bytes', 'max_total_bytes', self.total_bytes),
+                                          ('max_file_lines', 'max_total_lines', self.total_lines)):
+            per_file, total = self.get_option(file_key), self.get_option(total_key)
+            if total is not None:
+                total = max(total - used, 0)
+            candidates = [v for v in (per_file, total) if v is not None]
+            limits.append(min(candidates) if candidates else None)
+        return tuple(limits)
+
+    def write_section(self, out, rel_path, max_bytes=None, max_lines=None):
+        """
+        将单个文件写入输出: 状态未变化的文件直接拼接缓存片段，其余文件按固定大小分块流式拷贝，
+        峰值内存与文件大小无关；超出字节/行数上限时截断或跳过并写入标记。
+        返回写入的 (字节数, 行数, 内容哈希)，未完整写出的文件哈希为 None。
+        """
+        if self.profile:
+            start = time.perf_counter()
+            result = self._write_section(out, rel_path, max_bytes, max_lines)
+            self.profile.record_file(rel_path, time.perf_counter() - start, result[0])
+            return result
+        return self._write_section(out, rel_path, max_bytes, max_lines)
+
+    def _write_section(self, out, rel_path, max_bytes=None, max_lines=None):
+        abs_path = os.path.join(self.project_root, rel_path)
+        header = f"### File: `{rel_path}`\n"
+        if self.profile: self.profile.count('stat')
+        try:
+            st = os.stat(abs_path)
+            if max_bytes == 0 or max_lines == 0:
+                out.write(f"{header}> ⏭️ 已跳过: 超出总输出预算\n\n")
+                return 0, 0, None
+
+            entry = self.lookup_section(rel_path, abs_path, st)
+            if entry and (max_bytes is None or entry['bytes'] <= max_bytes) \
+                     and (max_lines is None or entry['lines'] <= max_lines):
+                out.write(entry['section'])
+                return entry['bytes'], entry['lines'], entry['hash']
+
+            if not entry:
+                if self.profile:
+                    self.profile.count('open')
+                    self.profile.count('bytes_read', min(st.st_size, SNIFF_BYTES))
+                reason = sniff_skip_reason(abs_path, self.get_option('skip_binary', True), self.get_option('skip_minified', True))
+                if reason:
+                    out.write(f"{header}> ⏭️ 已跳过: {reason} ({st.st_size} 字节)\n\n")
+                    return 0, 0, None
+
+            if max_bytes is not None and st.st_size > max_bytes and self.get_option('oversize_policy', 'truncate') == 'skip':
+                out.write(f"{header}> ⏭️ 已跳过: 文件过大 ({st.st_size} 字节, 上限 {max_bytes} 字节)\n\n")
+                return 0, 0, None
+
+            return self.stream_section(out, rel_path, abs_path, st, max_bytes, max_lines)
+        except Exception as e:
+            out.write(f"{header}> ⚠️ Error reading file: {e}\n\n")
+            return 0, 0, None
+
+    def manifest_entry(self, entry):
+        """ 启用片段缓存时清单只保存元数据，片段正文只在 sections.db 中存一份 """
+        if not self.section_cache: return entry
+        return {k: v for k, v in entry.items() if k != 'section'}
+
+    def lookup_section(self, rel_path, abs_path, st):
+        """ 依次查询任务清单、同根任务共享缓存与持久化片段缓存，命中后回填到前面的层级 """
+        entry = self.state_cache.peek(rel_path, st) if self.state_cache else None
+        if entry and 'section' not in entry:
+            body = self.section_cache.get(abs_path, rel_path, st) if self.section_cache else None
+            # 正文已被片段缓存淘汰时按未命中处理，重新读取
+            entry = {**entry, 'section': body['section']} if body else None
+        if entry:
+            self.state_cache.count(True)
+            return entry
+        if self.shared:
+            entry = self.shared.get_section(abs_path, st)
+            if entry: self.shared_hits += 1
+        if not entry and self.section_cache:
+            entry = self.section_cache.get(abs_path, rel_path, st)
+            if entry:
+                self.section_cache_hits += 1
+                if self.shared: self.shared.put_section(abs_path, entry)
+        if self.state_cache:
+            self.state_cache.count(entry is not None)
+            if entry: self.state_cache.store(rel_path, self.manifest_entry(entry))
+        return entry
+
+    def stream_section(self, out, rel_path, abs_path, st, max_bytes, max_lines):
+        _, ext = os.path.splitext(rel_path)
+        head = f"### File: `{rel_path}`\n```{EXT_TO_LANG.get(ext, '')}\n"
+        chunk_size = self.get_option('stream_chunk_size', 65536)
+        # 仅小文件在内存中保留完整片段用于写入增量缓存 / 共享缓存
+        caching = self.state_cache or self.shared or self.section_cache
+        keep = [] if caching and st.st_size <= CACHE_SECTION_MAX_BYTES else None
+        hasher = hashlib.blake2b(digest_size=16) if keep is not None or self.get_option('dedup', True) else None
+        nbytes = nlines = 0
+        started, clipped = False, False
+        last_char = ''
+
+        if self.profile: self.profile.count('open')
+        with open(abs_path, 'r', encoding='utf-8') as src_file:
+            while not clipped:
+                try:
+                    chunk = src_file.read(chunk_size)
+                except UnicodeDecodeError as e:
+                    # 首块就解码失败时与旧版一样只输出错误信息；中途失败则闭合代码块后标注
+                    if not started: raise
+                    out.write(f"\n```\n> ⚠️ Error reading file: {e}\n\n")
+                    return nbytes, nlines, None
+                if not started:
+                    out.write(head)
+                    if keep is not None: keep.append(head)
+                    started = True
+                if not chunk: break
+
+                chunk, chunk_bytes, chunk_lines, clipped = clip_text(
+                    chunk,
+                    None if max_bytes is None else max_bytes - nbytes,
+                    None if max_lines is None else max_lines - nlines)
+                if chunk:
+                    out.write(chunk)
+                    if keep is not None: keep.append(chunk)
+                    if hasher: hasher.update(chunk.encode('utf-8'))
+                    last_char = chunk[-1]
+                nbytes += chunk_bytes
+                nlines += chunk_lines
+
+        # 没有以换行结尾的最后一行也计入行数，缓存的片段才能正确地与行数上限比较
+        if last_char not in ('', '\n'): nlines += 1
+        tail = ('' if last_char == '\n' else '\n') + "```\n\n"
+        if clipped:
+            tail += f"> ✂️ 文件已截断: 仅保留前 {nlines} 行 / {nbytes} 字节 (原始大小 {st.st_size} 字节)\n\n"
+        out.write(tail)
+        if self.profile: self.profile.count('bytes_read', nbytes)
+
+        if clipped:
+            return nbytes, nlines, None
+        if keep is not None:
+            keep.append(tail)
+            entry = {
+                'mtime_ns': st.st_mtime_ns,
+                'size': st.st_size,
+                'hash': hasher.hexdigest(),
+                'bytes': nbytes,
+                'lines': nlines,
+                'tokens': self.file_tokens.get(rel_path),
+                'section': ''.join(keep),
+            }
+            if self.state_cache: self.state_cache.store(rel_path, self.manifest_entry(entry))
+            if self.shared: self.shared.put_section(abs_path, entry)
+            if self.section_cache: self.section_cache.put(abs_path, rel_path, st, entry)
+        return nbytes, nlines, hasher.hexdigest() if hasher else None
+
+    def render_section(self, rel_path, max_bytes, max_lines):
+        """ 在工作线程中把小文件片段渲染到内存；大文件返回 None，轮到它时由写出线程直接流式拷贝 """
+        if self.profile: self.profile.count('stat')
+        try:
+            if os.stat(os.path.join(self.project_root, rel_path)).st_size > CACHE_SECTION_MAX_BYTES:
+                return None
+        except OSError:
+            return None
+        buf = io.StringIO()
+        nbytes, nlines, digest = self.write_section(buf, rel_path, max_bytes, max_lines)
+        return buf.getvalue(), nbytes, nlines, digest
+
+    def write_duplicate(self, out, rel_path, digest):
+        """ 内容与前面某个文件完全相同时，只写一条指向首次出现位置的引用 """
+        first = self.seen_hashes.get(digest) if digest else None
+        if first is None: return False
+        out.write(f"### File: `{rel_path}`\n> 🔁 内容与 `{first}` 完全相同，见上文\n\n")
+        self.dedup_count += 1
+        return True
+
+    def emit_section(self, out, rel_path, rendered=None):
+        """ 写出一个文件片段，并向 BundleOutput 标出文件边界 (分片切换 / JSONL 记录) """
+        if not isinstance(out, BundleOutput):
+            self._emit_section(out, rel_path, rendered)
+            return
+        if rendered is not None:
+            expected = rendered[1]
+        else:
+            try:
+                expected = os.path.getsize(os.path.join(self.project_root, rel_path))
+            except OSError:
+                expected = 0
+        out.begin_file(rel_path, expected)
+        nbytes, nlines, digest = self._emit_section(out, rel_path, rendered)
+        out.end_file(nbytes, nlines, digest)
+
+    def _emit_section(self, out, rel_path, rendered=None):
+        """ 按总预算与去重规则写出一个文件片段: 预渲染结果放得下就直接写，否则按剩余预算重新流式写出 """
+        dedup = self.get_option('dedup', True)
+        max_bytes, max_lines = self.remaining_budget()
+        size = None
+        if rendered is not None:
+            text, nbytes, nlines, digest = rendered
+            if dedup and nbytes and self.write_duplicate(out, rel_path, digest):
+                return 0, 0, digest
+            if (max_bytes is None or nbytes <= max_bytes) and (max_lines is None or nlines <= max_lines):
+                out.write(text)
+                self.total_bytes += nbytes
+                self.total_lines += nlines
+                if dedup and nbytes and digest: self.seen_hashes.setdefault(digest, rel_path)
+                return nbytes, nlines, digest
+        elif dedup:
+            # 大文件只有在与之前某个大文件尺寸相同时，才值得先读一遍计算哈希
+            try:
+                abs_path = os.path.join(self.project_root, rel_path)
+                size = os.stat(abs_path).st_size
+                if size in self.seen_sizes and self.write_duplicate(out, rel_path, text_digest(abs_path)):
+                    return 0, 0, None
+            except Exception:
+                pass
+
+        nbytes, nlines, digest = self.write_section(out, rel_path, max_bytes, max_lines)
+        self.total_bytes += nbytes
+        self.total_lines += nlines
+        if dedup and nbytes and digest:
+            self.seen_hashes.setdefault(digest, rel_path)
+            if size is not None: self.seen_sizes.add(size)
+        return nbytes, nlines, digest
+
+    def write_sections(self, out):
+        """
+        按 collected_files 顺序写出所有文件片段。read_workers > 1 时读取、解码与渲染在有界线程池中并发进行，
+        最多提前 read_ahead 个文件，写出顺序保持不变；冷缓存或网络盘上瓶颈在打开文件的延迟。
+        """
+        self.total_bytes = self.total_lines = 0
+        self.seen_hashes, self.seen_sizes, self.dedup_count = {}, set(), 0
+        # 缓存命中统计只反映本次打包
+        self.shared_hits = self.section_cache_hits = 0
+        if self.state_cache: self.state_cache.hits = self.state_cache.misses = 0
+        per_file = (self.get_option('max_file_bytes'), self.get_option('max_file_lines'))
+        workers = self.get_option('read_workers', 1)
+        if workers <= 1 or len(self.collected_files) <= 1:
+            for rel_path in self.collected_files:
+                self.emit_section(out, rel_path, self.render_section(rel_path, *per_file))
+            return
+
+        read_ahead = max(self.get_option('read_ahead', 64), 1)
+        files = iter(self.collected_files)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            def _submit():
+                rel_path = next(files, None)
+                if rel_path is not None:
+                    pending.append((rel_path, pool.submit(self.render_section, rel_path, *per_file)))
+
+            for _ in range(read_ahead):
+                _submit()
+            while pending:
+                rel_path, future = pending.popleft()
+                self.emit_section(out, rel_path, future.result())
+                _submit()
+
+    def save_caches(self):
+        """ 保存增量清单、落盘片段缓存，并打印缓存与去重统计 """
+        if self.state_cache:
+            self.state_cache.prune(self.scanned_files)
+            self.state_cache.save()
+            print(f"♻️  增量缓存: 复用 {self.state_cache.hits} 个文件, 重新读取 {self.state_cache.misses} 个文件")
+        if self.shared_hits:
+            print(f"🔗 共享缓存: {self.shared_hits} 个文件直接复用同根目录其他任务已读取的内容")
+        if self.section_cache:
+            self.section_cache.flush()
+            if self.section_cache_hits:
+                print(f"🗂️  片段缓存: {self.section_cache_hits} 个文件复用其他任务或历史运行中读取的内容")
+        if self.dedup_count:
+            print(f"🔁 内容去重: {self.dedup_count} 个文件与前面的文件内容相同，仅输出引用")
+
     def generate_markdown(self):
         raw_filename = self.task_config.get('output_file', 'context_bundle.md')
         filename = os.path.basename(raw_filename)
         
         output_dir_path = os.path.join(SCRIPT_DIR, self.output_dir_name)
-        final_output_path = os.path.join(output_dir_path, filename)
 
         if not os.path.exists(output_dir_path):
             os.makedirs(output_dir_path)
             print(f"📁 已创建输出目录: {output_dir_path}")
         
         try:
-            with open(final_output_path, 'w', encoding='utf-8') as f:
-                f.write(f"# Project Context Bundle\n")
-                f.write(f"> Task: {self.task_name} | Root: {self.task_config.get('project_root', 'Global')}\n\n")
-                
-                f.write("## 1. Project Structure\n")
-                f.write("Files included (All non-ignored files and directories):\n\n")
-                f.write("```text\n")
-                f.write(self.generate_tree_structure())
-                f.write("\n```\n\n")
-                
-                f.write("## 2. File Contents\n\n")
+            if self.tree_text is None:
+                with self.timed('tree'):
+                    self.tree_text = self.generate_tree_structure()
+            tree_text = self.tree_text
+            header = f"# Project Context Bundle\n"
+            header += f"> Task: {self.task_name} | Root: {self.task_config.get('project_root', 'Global')}\n\n"
+            header += "## 1. Project Structure\n"
+            header += "Files included (All non-ignored files and directories):\n\n"
+            header += f"```text\n{tree_text}\n```\n\n"
+            header += "## 2. File Contents\n\n"
+
+            if self.get_option('max_tokens'):
+                with self.timed('tokens'):
+                    self.apply_token_budget(reserved_tokens=estimate_tokens(header) + 20)
+
+            formats = self.get_option('output_formats', ['md'])
+            if isinstance(formats, str): formats = [formats]
+            bundle = BundleOutput(output_dir_path, filename, self.task_name, formats,
+                                  shard_max_tokens=self.get_option('shard_max_tokens'),
+                                  shard_max_bytes=self.get_option('shard_max_bytes'))
+            with bundle as f:
+                f.write(header)
+                if self.get_option('max_tokens'):
+                    f.write(f"> Tokens: ~{self.total_tokens:,} / {self.get_option('max_tokens'):,} "
+                            f"(已纳入 {len(self.collected_files)} 个文件，跳过 {len(self.dropped_files)} 个)\n\n")
                 
-                for rel_path in self.collected_files:
-                    abs_path = os.path.join(self.project_root, rel_path)
-                    f.write(f"### File: `{rel_path}`\n")
-                    _, ext = os.path.splitext(rel_path)
-                    lang = EXT_TO_LANG.get(ext, '')
-                    
-                    try:
-                        with open(abs_path, 'r', encoding='utf-8') as src_file:
-                            content = src_file.read()
-                        f.write(f"```{lang}\n")
-                        f.write(content)
-                        if not content.endswith('\n'): f.write('\n')
-                        f.write("```\n\n")
-                    except Exception as e:
-                        f.write(f"> ⚠️ Error reading file: {e}\n\n")
-
-            print(f"🎉 成功生成文件: {final_output_path}")
+                with self.timed('write'):
+                    self.write_sections(f)
+
+            with self.timed('finalize'):
+                self.save_caches()
+
+            if bundle.shards:
+                print(f"🧩 分片输出: 共 {len(bundle.shards)} 个分片 ({bundle.shards[0]['file']} ...)")
+            for path in bundle.paths:
+                print(f"🎉 成功生成文件: {path}")
+
+            if self.profile:
+                written = bundle.paths + [os.path.join(output_dir_path, info['file']) for info in bundle.shards]
+                self.profile.count('bytes_written', sum(os.path.getsize(path) for path in written))
+                self.profile.report(bundle.stem)
+                self.profile = self.new_profile()
 
         except Exception as e:
             print(f"❌ 写入失败: {e}")
 
-if __name__ == "__main__":
-    packer = ContextPacker(task_name=CURRENT_TASK)
+# ================= 批量打包 =================
+
+def run_task(task_name, shared=None):
+    packer = ContextPacker(task_name=task_name, shared=shared)
     packer.scan_files()
-    packer.generate_markdown()
\ No newline at end of file
+    packer.generate_markdown()
+    return packer
+
+def pack_tasks(task_names, workers=4):
+    """
+    一次打包多个任务: 按 project_root 分组，同组任务顺序执行并共享一次目录扫描和文件片段缓存，
+    不同根目录的分组在线程池中并行处理。返回 {任务名: ContextPacker}。
+    """
+    tasks = GLOBAL_CONFIG.get('tasks', {})
+    unknown = [name for name in task_names if name not in tasks]
+    if unknown:
+        print(f"❌ 错误: 任务 {', '.join(unknown)} 未在配置中定义。")
+        print(f"📋 可用任务: {', '.join(tasks.keys())}")
+        exit(1)
+
+    groups = {}
+    for name in dict.fromkeys(task_names):
+        root = os.path.abspath(os.path.join(SCRIPT_DIR, tasks[name].get('project_root', '../')))
+        groups.setdefault(root, []).append(name)
+
+    def _run_group(names):
+        shared = SharedContext()
+        return {name: run_task(name, shared) for name in names}
+
+    results = {}
+    print(f"📦 批量打包 {len(task_names)} 个任务，共 {len(groups)} 个不同的项目根目录")
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(groups)))) as pool:
+        for group_result in pool.map(_run_group, groups.values()):
+            results.update(group_result)
+    return results
+
+# ================= 监视模式 =================
+
+class _ChangeCollector(FileSystemEventHandler):
+    """ watchdog 事件回调: 记录结构发生变化的目录与内容被修改的文件 """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dirty_dirs, self.changed_files = set(), set()
+
+    def on_any_event(self, event):
+        with self.lock:
+            if event.event_type == 'modified' and not event.is_directory:
+                self.changed_files.add(os.path.abspath(event.src_path))
+            elif event.event_type in ('created', 'deleted', 'moved'):
+                for path in (event.src_path, getattr(event, 'dest_path', '')):
+                    if path: self.dirty_dirs.add(os.path.dirname(os.path.abspath(path)))
+
+    def drain(self):
+        with self.lock:
+            dirty_dirs, changed_files = self.dirty_dirs, self.changed_files
+            self.dirty_dirs, self.changed_files = set(), set()
+        return dirty_dirs, changed_files
+
+class TaskWatcher:
+    """
+    --watch 模式: 持续监视任务根目录，保存后在约 100 ms 内刷新输出。
+    - 只 stat 已扫描过的目录 (mtime 变化说明有增删) 与已打包的文件，不做全量重扫；
+    - 目录变化时只重新列出这些目录，其余目录复用 SharedContext 中的列表，再重建目录树；
+    - 文件变化时借助增量缓存只重新读取改动的文件，其余片段直接拼接。
+    """
+
+    def __init__(self, packers):
+        self.packers = packers
+        self.interval = GLOBAL_CONFIG.get('watch_interval', 0.1)
+        self.debounce = GLOBAL_CONFIG.get('watch_debounce', 0.1)
+        self.groups = {}
+        for packer in packers:
+            self.groups.setdefault(id(packer.shared), (packer.shared, []))[1].append(packer)
+        self.snapshots = {key: self.snapshot(shared, group) for key, (shared, group) in self.groups.items()}
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def snapshot(self, shared, group):
+        dirs = {abs_dir: self._stamp(abs_dir) for abs_dir in list(shared.listings)}
+        files = {}
+        for packer in group:
+            # 被 Token 预算跳过的文件也要监视: 它们变小后可能重新放得进预算
+            for rel_path in packer.scanned_files:
+                abs_path = os.path.join(packer.project_root, rel_path)
+                files[abs_path] = self._stamp(abs_path)
+        return dirs, files
+
+    def poll(self, key):
+        """ 对比快照，返回 (结构变化的目录, 内容变化的文件) """
+        dirs, files = self.snapshots[key]
+        dirty_dirs = {d for d, stamp in dirs.items() if self._stamp(d) != stamp}
+        changed_files = {f for f, stamp in files.items() if self._stamp(f) != stamp}
+        return dirty_dirs, changed_files
+
+    def refresh(self, key, dirty_dirs, changed_files):
+        shared, group = self.groups[key]
+        start = time.perf_counter()
+        # 只关心扫描过的目录 (被忽略的目录如 .git 内的变化不会触发重建)
+        dirty_dirs = {d for d in dirty_dirs if d in shared.listings}
+        with shared.lock:
+            for abs_dir in dirty_dirs:
+                shared.listings.pop(abs_dir, None)
+
+        rebuilt = []
+        for packer in group:
+            owned = any(os.path.join(packer.project_root, p) in changed_files for p in packer.scanned_files)
+            if not dirty_dirs and not owned:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                if dirty_dirs: packer.scan_files()
+                packer.generate_markdown()
+            rebuilt.append(packer)
+        self.snapshots[key] = self.snapshot(shared, group)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        for packer in rebuilt:
+            reread = packer.state_cache.misses if packer.state_cache else len(packer.collected_files)
+            tree = "，目录树已更新" if dirty_dirs else ""
+            print(f"🔄 [{time.strftime('%H:%M:%S')}] {packer.task_name}: 重新读取 {reread} 个文件{tree} ({elapsed:.0f} ms)")
+
+    def run(self):
+        collector, observer = None, None
+        if Observer is not None:
+            collector, observer = _ChangeCollector(), Observer()
+            for root in {p.project_root for p in self.packers}:
+                observer.schedule(collector, root, recursive=True)
+            observer.start()
+        mode = "系统文件事件 (watchdog)" if observer else f"轮询 (每 {self.interval * 1000:.0f} ms)"
+        print(f"👀 监视模式已启动 [{mode}]，按 Ctrl+C 退出...")
+
+        try:
+            while True:
+                time.sleep(self.interval)
+                if observer:
+                    dirty_dirs, changed_files = collector.drain()
+                    if not (dirty_dirs or changed_files): continue
+                    # 防抖: 等待连续保存平息
+                    while True:
+                        time.sleep(self.debounce)
+                        more_dirs, more_files = collector.drain()
+                        if not (more_dirs or more_files): break
+                        dirty_dirs |= more_dirs
+                        changed_files |= more_files
+                    for key in self.groups:
+                        self.refresh(key, dirty_dirs, changed_files)
+                    continue
+
+                for key in self.groups:
+                    dirty_dirs, changed_files = self.poll(key)
+                    if not (dirty_dirs or changed_files): continue
+                    # 防抖: 改动后继续观察，直到一个防抖周期内不再有新变化
+                    while True:
+                        self.snapshots[key] = self.snapshot(*self.groups[key])
+                        time.sleep(self.debounce)
+                        more_dirs, more_files = self.poll(key)
+                        if not (more_dirs or more_files): break
+                        dirty_dirs |= more_dirs
+                        changed_files |= more_files
+                    self.refresh(key, dirty_dirs, changed_files)
+        except KeyboardInterrupt:
+            print("\n👋 已退出监视模式")
+        finally:
+            if observer:
+                observer.stop()
+                observer.join()
+
+def watch_tasks(packers):
+    TaskWatcher(packers).run()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="将项目代码打包为单个 markdown 上下文文件")
+    parser.add_argument('-t', '--task', action='append', dest='tasks', metavar='NAME',
+                        help=f"要打包的任务 (可重复指定)，默认为 CURRENT_TASK ({CURRENT_TASK})")
+    parser.add_argument('--all', action='store_true', help="打包配置中的所有任务")
+    parser.add_argument('--list', action='store_true', help="列出所有可用任务")
+    parser.add_argument('--workers', type=int, default=4, help="批量模式下并行处理的根目录数")
+    parser.add_argument('--watch', action='store_true', help="打包后持续监视文件变化并自动增量更新输出")
+    parser.add_argument('--profile', action='store_true', help="打印各阶段耗时与 I/O 统计，并写出 .profile.json")
+    parser.add_argument('--cprofile', action='store_true', help="同 --profile，并额外保存 cProfile 数据 (.prof)")
+    args = parser.parse_args()
+    if args.profile or args.cprofile:
+        GLOBAL_CONFIG['profile'] = True
+        GLOBAL_CONFIG['profile_cprofile'] = args.cprofile
+
+    if args.list:
+        for name, task in GLOBAL_CONFIG['tasks'].items():
+            print(f"   - {name}: {task.get('description', '')} ({task.get('project_root', '../')})")
+    elif args.all or (args.tasks and len(args.tasks) > 1) or args.watch:
+        task_names = list(GLOBAL_CONFIG['tasks']) if args.all else (args.tasks or [CURRENT_TASK])
+        packers = pack_tasks(task_names, workers=args.workers)
+        if args.watch:
+            watch_tasks(list(packers.values()))
+    else:
+        run_task(args.tasks[0] if args.tasks else CURRENT_TASK)
\ No newline at end of file
@@ -0,0 +1,418 @@
+import os
+import sys
+import time
+import random
+import hashlib
+import shutil
+import fnmatch
+import tempfile
+import tracemalloc
+import contextlib
+import importlib.util
+
+# ==============================================================================
+#                   ContextPacker 性能基准 (python 2-benchmark.py [名称...])
+# ==============================================================================
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_packer():
+    """ 1-packer.py 文件名不是合法模块名, 这里按路径加载 """
+    spec = importlib.util.spec_from_file_location("packer", os.path.join(SCRIPT_DIR, "1-packer.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+packer = load_packer()
+
+# 基准测试使用独立的临时片段缓存，不污染 .packer_cache/sections
+BENCH_CACHE_DIR = tempfile.mkdtemp(prefix="packer_bench_cache_")
+packer._section_cache = packer.SectionCache(os.path.join(BENCH_CACHE_DIR, 'sections.db'), 256 * 1024 * 1024)
+
+def timed(func, *args, repeat=3):
+    """ 取多次运行中的最短耗时 """
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def quietly(func, *args, **kwargs):
+    """ 屏蔽被测函数的进度输出 """
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        return func(*args, **kwargs)
+
+def make_synthetic_paths(count, seed=0):
+    """ 生成类似 monorepo 的相对路径 (含需要被忽略的目录与文件) """
+    rng = random.Random(seed)
+    dirs = ["src", "lib", "tests", "docs", "node_modules", "build", "dist", ".git", "__pycache__", "utils", "api", "models"]
+    exts = [".py", ".ts", ".tsx", ".js", ".css", ".md", ".json", ".pyc", ".DS_Store"]
+    paths = []
+    for i in range(count):
+        depth = rng.randint(1, 6)
+        parts = [rng.choice(dirs) for _ in range(depth)]
+        parts.append(f"file_{i}{rng.choice(exts)}")
+        paths.append(os.sep.join(parts))
+    return paths
+
+def make_synthetic_tree(root, file_count, seed=0, lines=40):
+    """ 在磁盘上生成一个包含 file_count 个文件的项目树 """
+    rng = random.Random(seed)
+    for rel_path in make_synthetic_paths(file_count, seed):
+        abs_path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+        with open(abs_path, 'w', encoding='utf-8') as f:
+            for j in range(rng.randint(1, lines)):
+                f.write(f"def func_{j}(x):\n    return x * {j}  # {rel_path}\n")
+
+def make_packer(root, **options):
+    """ 基于临时任务配置构造 ContextPacker (不影响用户配置中的任务) """
+    task = {"project_root": root, "output_file": "benchmark.md", "paths": ["."],
+            "extensions": [".py", ".ts", ".tsx", ".js", ".css", ".md", ".json"], **options}
+    packer.GLOBAL_CONFIG["tasks"]["__benchmark__"] = task
+    return quietly(packer.ContextPacker, "__benchmark__")
+
+# ================= 1. 忽略规则匹配 =================
+
+def legacy_is_ignored(patterns, rel_path):
+    """ 旧实现: 对每条规则分别用 fnmatch 匹配文件名与相对路径 """
+    name = os.path.basename(rel_path)
+    for pattern in patterns:
+        if fnmatch.fnmatch(name, pattern):
+            return True
+        if fnmatch.fnmatch(rel_path, pattern):
+            return True
+    return False
+
+def bench_ignore(count=200000):
+    patterns = packer.GLOBAL_CONFIG["global_ignore"]
+    paths = make_synthetic_paths(count)
+    matcher = packer.IgnoreMatcher(patterns)
+
+    t_old, old = timed(lambda: [legacy_is_ignored(patterns, p) for p in paths])
+    t_new, new = timed(lambda: [matcher.match(p) for p in paths])
+
+    mismatches = sum(1 for a, b in zip(old, new) if a != b)
+    print(f"🔎 忽略规则匹配 ({count} 条路径, {len(patterns)} 条规则)")
+    print(f"   - 逐条 fnmatch : {t_old * 1000:8.1f} ms")
+    print(f"   - IgnoreMatcher: {t_new * 1000:8.1f} ms  (加速 {t_old / t_new:.1f}x)")
+    print(f"   - 结果不一致数 : {mismatches}")
+
+# ================= 2. 目录扫描 =================
+
+def legacy_scan(p):
+    """ 旧实现: os.walk + 每个文件重复 relpath/join/splitext """
+    content, structure = set(), set()
+    for root, dirs, files in os.walk(p.project_root):
+        rel_root = os.path.relpath(root, p.project_root)
+        if rel_root != "." and not p.is_ignored(rel_root, is_dir=True):
+            structure.add(rel_root)
+        dirs[:] = [d for d in dirs if not p.is_ignored(os.path.join(rel_root, d), is_dir=True)]
+        for file in files:
+            rel_file_path = os.path.relpath(os.path.join(root, file), p.project_root)
+            if p.is_ignored(rel_file_path):
+                continue
+            structure.add(rel_file_path)
+            if os.path.splitext(file)[1] in p.target_extensions:
+                content.add(rel_file_path)
+    return content, structure
+
+def bench_scan(file_count=20000):
+    root = tempfile.mkdtemp(prefix="packer_bench_")
+    try:
+        make_synthetic_tree(root, file_count, lines=1)
+        p = make_packer(root)
+
+        def _scan(workers):
+            p.task_config["scan_workers"] = workers
+            quietly(p.scan_files)
+            return set(p.collected_files), set(p.structure_files)
+
+        t_old, old = timed(legacy_scan, p)
+        t_one, one = timed(_scan, 1)
+        t_many, many = timed(_scan, 8)
+        print(f"📂 目录扫描 ({file_count} 个文件)")
+        print(f"   - os.walk (旧)        : {t_old * 1000:8.1f} ms")
+        print(f"   - os.scandir 单线程   : {t_one * 1000:8.1f} ms  (加速 {t_old / t_one:.1f}x)")
+        print(f"   - os.scandir 8 线程   : {t_many * 1000:8.1f} ms  (加速 {t_old / t_many:.1f}x)")
+        print(f"   - 结果一致: {old == one == many}")
+        print("   (本地磁盘有页缓存时多线程反而更慢, 默认 scan_workers=1; 多线程只用于 NFS/网络盘等高延迟存储)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+# ================= 3. 增量打包 =================
+
+def bench_incremental(file_count=5000):
+    root = tempfile.mkdtemp(prefix="packer_bench_")
+    p = None
+    try:
+        make_synthetic_tree(root, file_count)
+        p = make_packer(root)
+        p.output_dir_name = os.path.join(root, "__output__")
+        quietly(p.scan_files)
+
+        def _pack():
+            quietly(p.generate_markdown)
+
+        t_cold, _ = timed(lambda: (p.state_cache.files.clear(), _pack()), repeat=1)
+        t_warm, _ = timed(_pack)
+        # 修改一个文件后重新打包
+        with open(os.path.join(root, p.collected_files[0]), 'a', encoding='utf-8') as f:
+            f.write("# edited\n")
+        t_edit, _ = timed(_pack, repeat=1)
+        print(f"♻️  增量打包 ({len(p.collected_files)} 个内容文件)")
+        print(f"   - 首次打包 (无缓存)   : {t_cold * 1000:8.1f} ms")
+        print(f"   - 无改动重新打包      : {t_warm * 1000:8.1f} ms")
+        print(f"   - 修改 1 个文件后打包 : {t_edit * 1000:8.1f} ms  (重新读取 {p.state_cache.misses} 个)")
+    finally:
+        if p and os.path.exists(p.state_cache.manifest_path): os.remove(p.state_cache.manifest_path)
+        shutil.rmtree(root, ignore_errors=True)
+
+# ================= 4. 流式输出 =================
+
+def peak_memory(func, *args):
+    """ 返回 (耗时, Python 堆内存峰值) """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        func(*args)
+        return time.perf_counter() - start, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def legacy_write(p, out_path):
+    """ 旧实现: 整个文件 read() 进内存后再写出 """
+    with open(out_path, 'w', encoding='utf-8') as f:
+        for rel_path in p.collected_files:
+            with open(os.path.join(p.project_root, rel_path), 'r', encoding='utf-8') as src_file:
+                content = src_file.read()
+            f.write(content)
+
+def bench_stream(megabytes=64):
+    root = tempfile.mkdtemp(prefix="packer_bench_")
+    try:
+        with open(os.path.join(root, "dump.py"), 'w', encoding='utf-8') as f:
+            line = "x = " + "1" * 60 + "\n"
+            for _ in range(megabytes * 1024 * 1024 // len(line)):
+                f.write(line)
+        p = make_packer(root, incremental=False, max_file_bytes=None)
+        p.output_dir_name = os.path.join(root, "__output__")
+        quietly(p.scan_files)
+        os.makedirs(os.path.join(root, "__output__"), exist_ok=True)
+
+        t_old, m_old = peak_memory(legacy_write, p, os.path.join(root, "__output__", "legacy.md"))
+        t_new, m_new = peak_memory(quietly, p.generate_markdown)
+        print(f"🌊 流式输出 (单个 {megabytes} MB 文件)")
+        print(f"   - 整体读取 (旧) : {t_old * 1000:8.1f} ms, 内存峰值 {m_old / 1048576:8.1f} MB")
+        print(f"   - 分块流式拷贝  : {t_new * 1000:8.1f} ms, 内存峰值 {m_new / 1048576:8.1f} MB")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+# ================= 5. Token 估算 =================
+
+def bench_tokens(megabytes=16):
+    with open(os.path.join(SCRIPT_DIR, "1-packer.py"), 'r', encoding='utf-8') as f:
+        sample = f.read()
+    text = sample * max(1, megabytes * 1024 * 1024 // len(sample.encode('utf-8')))
+    t, tokens = timed(packer.estimate_tokens, text)
+    size = len(text.encode('utf-8')) / 1048576
+    print(f"🧮 Token 估算 ({size:.1f} MB 源码)")
+    print(f"   - estimate_tokens: {t * 1000:8.1f} ms  ({size / t:.0f} MB/s, ~{tokens:,} tokens, {len(text) / tokens:.2f} 字符/token)")
+
+# ================= 6. 并发读取 =================
+
+def bench_read(file_count=10000):
+    root = tempfile.mkdtemp(prefix="packer_bench_")
+    try:
+        # 全部生成到不被忽略的目录中，确保 file_count 个文件都会被打包
+        for i in range(file_count):
+            sub = os.path.join(root, f"pkg_{i % 100}")
+            os.makedirs(sub, exist_ok=True)
+            with open(os.path.join(sub, f"mod_{i}.py"), 'w', encoding='utf-8') as f:
+                f.write("".join(f"def func_{j}(x):\n    return x * {j}\n" for j in range(50)))
+        # 关闭片段缓存，否则第二次起的 "读取" 都由 sections.db 提供，测不到打开文件的延迟
+        p = make_packer(root, incremental=False, section_cache=False)
+        p.output_dir_name = os.path.join(root, "__output__")
+        quietly(p.scan_files)
+        out_path = os.path.join(p.output_dir_name, "benchmark.md")
+
+        def _slow_open(*args, **kwargs):
+            # 模拟网络盘上每次打开文件的往返延迟
+            time.sleep(latency_ms / 1000)
+            return open(*args, **kwargs)
+
+        for latency_ms in (0, 0.5):
+            if latency_ms: packer.open = _slow_open
+            results = {}
+            for workers in (1, 4, 8, 16):
+                p.task_config["read_workers"] = workers
+                t, _ = timed(quietly, p.generate_markdown, repeat=1 if latency_ms else 3)
+                with open(out_path, 'rb') as f:
+                    results[workers] = (t, hashlib.blake2b(f.read()).hexdigest())
+
+            label = f"模拟每次 open 延迟 {latency_ms} ms" if latency_ms else "本地磁盘, 页缓存已热"
+            print(f"🧵 并发读取 ({len(p.collected_files)} 个文件, {label})")
+            base = results[1][0]
+            for workers, (t, _) in results.items():
+                print(f"   - read_workers={workers:<3}: {t * 1000:8.1f} ms  (加速 {base / t:.1f}x)")
+            print(f"   - 输出一致: {len({d for _, d in results.values()}) == 1}")
+    finally:
+        packer.__dict__.pop('open', None)
+        shutil.rmtree(root, ignore_errors=True)
+
+# ================= 7. 批量打包 =================
+
+def bench_batch(file_count=20000, task_count=4):
+    root = tempfile.mkdtemp(prefix="packer_bench_")
+    saved_tasks = dict(packer.GLOBAL_CONFIG["tasks"])
+    try:
+        make_synthetic_tree(root, file_count, lines=5)
+        # 多个任务指向同一根目录，paths 相互重叠 (类似 paper_chapter3 / 3-1 / 3-2)
+        names = [f"__batch_{i}__" for i in range(task_count)]
+        for i, name in enumerate(names):
+            packer.GLOBAL_CONFIG["tasks"][name] = {
+                "project_root": root, "output_file": f"{name}.md", "paths": ["src", "lib", "utils"][:i % 3 + 1],
+                "extensions": [".py", ".ts"], "incremental": False}
+
+        def _pack(task_names, shared=None):
+            for name in task_names:
+                p = packer.ContextPacker(name, shared=shared)
+                p.output_dir_name = os.path.join(root, "__output__")
+                p.scan_files()
+                p.generate_markdown()
+
+        t_sep, _ = timed(quietly, _pack, names, repeat=1)
+        t_batch, _ = timed(lambda: quietly(_pack, names, packer.SharedContext()), repeat=1)
+        t_one, _ = timed(quietly, _pack, names[2:3], repeat=1)
+        print(f"📦 批量打包 ({task_count} 个同根任务, {file_count} 个文件)")
+        print(f"   - 逐个任务独立打包    : {t_sep * 1000:8.1f} ms")
+        print(f"   - 共享扫描与文件缓存  : {t_batch * 1000:8.1f} ms  (加速 {t_sep / t_batch:.1f}x)")
+        print(f"   - 参考: 单个最大任务  : {t_one * 1000:8.1f} ms")
+    finally:
+        packer.GLOBAL_CONFIG["tasks"] = saved_tasks
+        shutil.rmtree(root, ignore_errors=True)
+
+# ================= 8. 内容去重与片段缓存 =================
+
+def bench_dedup(file_count=2000, copies=3):
+    root = tempfile.mkdtemp(prefix="packer_bench_")
+    try:
+        # 模拟 vendored 副本: 同一批文件在多个目录下各有一份
+        for i in range(file_count):
+            body = "".join(f"def func_{i}_{j}(x):\n    return x * {j}\n" for j in range(30))
+            for c in range(copies):
+                sub = os.path.join(root, f"copy_{c}", f"pkg_{i % 50}")
+                os.makedirs(sub, exist_ok=True)
+                with open(os.path.join(sub, f"mod_{i}.py"), 'w', encoding='utf-8') as f:
+                    f.write(body)
+
+        out_path = os.path.join(root, "__output__", "benchmark.md")
+        sizes, times = {}, {}
+        for dedup in (False, True):
+            p = make_packer(root, incremental=False, section_cache=False, dedup=dedup)
+            p.output_dir_name = os.path.join(root, "__output__")
+            quietly(p.scan_files)
+            times[dedup], _ = timed(quietly, p.generate_markdown, repeat=1)
+            sizes[dedup] = os.path.getsize(out_path)
+
+        # 片段缓存: 另一个任务 (无增量清单) 打包同一批文件时无需再读取源文件
+        p = make_packer(root, incremental=False, section_cache=True)
+        p.output_dir_name = os.path.join(root, "__output__")
+        quietly(p.scan_files)
+        t_cold, _ = timed(quietly, p.generate_markdown, repeat=1)
+        t_warm, _ = timed(quietly, p.generate_markdown, repeat=1)
+        hits = p.section_cache_hits
+
+        print(f"🔁 内容去重 ({file_count} 个文件 × {copies} 份副本)")
+        print(f"   - 不去重: {sizes[False] / 1048576:6.2f} MB, {times[False] * 1000:8.1f} ms")
+        print(f"   - 去重  : {sizes[True] / 1048576:6.2f} MB, {times[True] * 1000:8.1f} ms  (体积缩小 {sizes[False] / sizes[True]:.1f}x)")
+        print(f"🗂️  片段缓存: 首次 {t_cold * 1000:8.1f} ms, 再次打包 {t_warm * 1000:8.1f} ms (命中 {hits} 个文件)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+# ================= 9. 性能剖析开销 =================
+
+def bench_profile(file_count=10000):
+    root = tempfile.mkdtemp(prefix="packer_bench_")
+    try:
+        make_synthetic_tree(root, file_count, lines=5)
+        times = {}
+        for profile in (False, True):
+            p = make_packer(root, incremental=False, section_cache=False, profile=profile)
+            p.output_dir_name = os.path.join(root, "__output__")
+
+            def _run():
+                p.profile = p.new_profile()
+                p.scan_files()
+                p.generate_markdown()
+
+            times[profile], _ = timed(quietly, _run)
+        print(f"⏱️  性能剖析开销 ({file_count} 个文件, 扫描 + 冷读取)")
+        print(f"   - 关闭: {times[False] * 1000:8.1f} ms")
+        print(f"   - 开启: {times[True] * 1000:8.1f} ms  (额外 {(times[True] / times[False] - 1) * 100:+.1f}%)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+# ================= 10. 目录树渲染 =================
+
+def legacy_tree(paths):
+    """ 旧实现: 构建嵌套字典后递归渲染 """
+    tree = {}
+    for path in paths:
+        current = tree
+        for part in path.split(os.sep):
+            current = current.setdefault(part, {})
+    lines = ["."]
+    def _build(node, prefix=""):
+        keys = sorted(node.keys())
+        for i, key in enumerate(keys):
+            is_last = i == len(keys) - 1
+            lines.append(f"{prefix}{'└── ' if is_last else '├── '}{key}")
+            if node[key]:
+                _build(node[key], prefix + ("    " if is_last else "│   "))
+    _build(tree)
+    return "\n".join(lines)
+
+def bench_tree(count=300000):
+    paths = sorted(make_synthetic_paths(count))
+    render = lambda **kw: "\n".join(packer.iter_tree_lines(paths, **kw))
+    t_old, legacy = timed(legacy_tree, paths)
+    t_new, _ = timed(render)
+    t_cut, cut = timed(lambda: render(max_entries=50, max_depth=4))
+    (_, mem_old), (_, mem_new) = peak_memory(legacy_tree, paths), peak_memory(render)
+    print(f"🌲 目录树渲染 ({count} 个路径, {legacy.count(chr(10)) + 1} 行)")
+    print(f"   - 旧实现 (嵌套字典 + 递归): {t_old * 1000:8.1f} ms, 峰值 {mem_old / 1048576:6.1f} MB")
+    print(f"   - 迭代渲染                : {t_new * 1000:8.1f} ms, 峰值 {mem_new / 1048576:6.1f} MB")
+    print(f"   - 折叠 (50 项 / 4 层)     : {t_cut * 1000:8.1f} ms, {cut.count(chr(10)) + 1} 行")
+    deep = [os.sep.join(f"d{i}" for i in range(3000))]
+    try:
+        legacy_tree(deep)
+        print("   - 3000 层深目录: 旧实现正常")
+    except RecursionError:
+        print("   - 3000 层深目录: 旧实现 RecursionError, 迭代渲染 " + f"{len(list(packer.iter_tree_lines(deep)))} 行")
+
+# ================= 入口 =================
+
+BENCHMARKS = {
+    "ignore": bench_ignore,
+    "scan": bench_scan,
+    "incremental": bench_incremental,
+    "stream": bench_stream,
+    "tokens": bench_tokens,
+    "read": bench_read,
+    "batch": bench_batch,
+    "dedup": bench_dedup,
+    "profile": bench_profile,
+    "tree": bench_tree,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"❌ 未知基准: {name}。可用: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
+    packer._section_cache.conn.close()
+    shutil.rmtree(BENCH_CACHE_DIR, ignore_errors=True)
@@ -3,9 +3,23 @@ import json
 import time
 import random
 import re
+import zlib
+import sqlite3
+import hashlib
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+import numpy as np
 import pandas as pd
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 from deep_translator import GoogleTranslator
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
 import matplotlib.pyplot as plt
 from tqdm import tqdm
 
@@ -31,6 +45,7 @@ KEYWORDS = [
 ]
 
 TARGET_COUNT_PER_KEYWORD = 100   # 🎯 每个关键词想要抓取的数量
+RESULTS_PER_PAGE = 10            # Scholar 每页结果数: 10 或 20 (20 时 URL 带 num=20，翻页次数减半)
 
 # 2. 网络与代理设置
 # 注意：如果你的代理不需要，请将 PROXY_SERVER 设为 None
@@ -40,7 +55,7 @@ PROXIES = {"http": PROXY_SERVER, "https": PROXY_SERVER} if PROXY_SERVER else Non
 # 3. 输出路径设置
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.join(BASE_DIR, 'output')
-RAW_DATA_FILE = os.path.join(OUTPUT_DIR, 'multi_keyword_data.json')
+RAW_DATA_FILE = os.path.join(OUTPUT_DIR, 'multi_keyword_data.jsonl')   # 原始数据，每行一篇 (JSONL)
 REPORT_FILE = os.path.join(OUTPUT_DIR, 'multi_keyword_report.xlsx')
 CHART_FILE = os.path.join(OUTPUT_DIR, 'multi_keyword_chart.png')
 
@@ -52,6 +67,91 @@ TIMEOUT_MS = 60000          # 页面加载超时时间
 MIN_SLEEP = 2.0             # 最小间隔(秒)
 MAX_SLEEP = 5.0             # 最大间隔(秒)
 
+# 5. 详情页并发抓取 (同一个浏览器上下文中的页面池)
+DETAIL_CONCURRENCY = 6      # 同时打开的详情页数量
+DETAIL_TIMEOUT_MS = 45000   # 详情页加载超时时间
+DOMAIN_CONCURRENCY = 2      # 同一网站默认最多同时抓取几篇
+DETAIL_QUEUE_SIZE = 30      # 列表采集与详情抓取同时进行，列表最多领先详情几篇 (队列满时暂停翻页)
+DOMAIN_LIMITS = {           # 个别网站单独设置并发上限 (按域名后缀匹配)
+    "arxiv.org": 4,
+    "ieeexplore.ieee.org": 2,
+    "link.springer.com": 2,
+    "dl.acm.org": 1,
+    "sciencedirect.com": 1,
+}
+
+# 6. 免浏览器快速通道: 先用 keep-alive HTTP 会话直接解析原始 HTML 的 citation_* 等 meta 标签，
+#    请求失败、遇到验证页或拿不到摘要时再交给浏览器
+FAST_FETCH = True
+FAST_FETCH_TIMEOUT = 15     # 单次请求超时 (秒)
+FAST_FETCH_POOL = 16        # 连接池大小
+
+# 7. 本地缓存: 抓过的 Scholar 列表页和详情页提取结果按 URL 保存 (压缩后存入 SQLite)，有效期内重跑直接复用
+CACHE_FILE = os.path.join(OUTPUT_DIR, 'crawl_cache.db')   # 设为 None 关闭缓存
+CACHE_TTL_DAYS = 7          # 有效期 (天)
+CACHE_MAX_MB = 200          # 容量上限，超出后淘汰最久未使用的条目
+
+# 8. 断点续爬: 每个列表页、每篇详情完成后立即追加一行到 JSONL，中断后重跑会跳过已完成的关键词页码和论文
+CHECKPOINT_FILE = os.path.join(OUTPUT_DIR, 'crawl_checkpoint.jsonl')   # 设为 None 关闭
+
+# 9. 翻译设置: 多条文本合并为一次请求、线程池并发、失败指数退避重试，译文按 (原文, 目标语言) 存入翻译记忆
+TRANSLATE_BACKEND = "google"    # "google" 谷歌翻译 / "stub" 本地占位翻译 (离线调试用，不联网)
+TRANSLATE_WORKERS = 4           # 并发请求数
+TRANSLATE_BATCH_CHARS = 4500    # 单次请求合并的最大字符数 (谷歌翻译单次上限 5000)
+TRANSLATE_RETRIES = 3           # 失败重试次数
+TRANSLATION_MEMORY_FILE = os.path.join(OUTPUT_DIR, 'translation_memory.db')   # 设为 None 不保存翻译记忆
+
+# 10. 自适应限速 (代替固定的随机等待): 每个网站一个令牌桶，响应正常时逐步提速，
+#     遇到验证码或超时立即减速并指数退避
+RATE_LIMITS = {             # 网站 (按域名后缀匹配) -> (初始速率, 最高速率)，单位: 次/秒
+    "scholar.google.com": (0.2, 0.4),
+}
+DEFAULT_RATE = (1.0, 4.0)   # 其他网站
+RATE_BURST = 2              # 允许的突发请求数
+MIN_RATE = 0.05             # 退避后的最低速率
+BACKOFF_BASE = 10.0         # 首次退避时长 (秒)，连续受阻时翻倍
+BACKOFF_MAX = 300.0         # 退避时长上限 (秒)
+
+# 11. 多窗口并行搜索关键词: 上面的主浏览器之外再开几个独立浏览器，各用自己的用户数据目录和代理 (出口 IP)，
+#     关键词分给所有窗口同时翻页，各窗口单独限速；详情页仍由主浏览器抓取。为空时只用主浏览器
+SEARCH_CONTEXTS = [
+    # {"user_data_dir": os.path.join(os.getcwd(), "user_data_browser_2"), "proxy": "http://127.0.0.1:7898"},
+    # {"user_data_dir": os.path.join(os.getcwd(), "user_data_browser_3"), "proxy": None},
+]
+
+# 12. 详情页请求拦截: 提取只需要 meta 标签和摘要元素，图片、视频、字体和第三方脚本 (广告、统计) 直接拦截
+BLOCK_RESOURCES = True
+BLOCKED_RESOURCE_TYPES = ["image", "media", "font"]   # 任何网站都拦截的资源类型
+BLOCK_THIRD_PARTY_SCRIPTS = True                      # 拦截不属于本站的脚本
+BLOCKED_HOSTS = [                                     # 任何网站都拦截的域名 (按后缀匹配)
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "hotjar.com", "scorecardresearch.com", "adobedtm.com", "newrelic.com",
+]
+RESOURCE_RULES = {          # 网站 (按域名后缀匹配) -> allow: 视为本站的域名 (其脚本不拦截) / deny: 额外拦截的域名
+    "sciencedirect.com": {"allow": ["sciencedirectassets.com"]},
+    "springer.com": {"allow": ["springernature.com"]},
+    "nature.com": {"allow": ["springernature.com"]},
+}
+DETAIL_WAIT_UNTIL = "domcontentloaded"   # "commit" 收到响应头即返回，之后等摘要元素出现即可提取
+DETAIL_READY_TIMEOUT = 4000              # 等待摘要元素 / 页面加载完成的最长时间 (毫秒)
+
+# 13. 期刊分级规则: (正则, 等级)，对 venue 文本按顺序匹配 (不区分大小写)，先命中先得，可按需增加
+VENUE_LEVELS = [
+    (r"ieee trans|acm trans", "顶刊 (Trans)"),
+    (r"nature|science", "神刊"),
+    (r"cvpr|iccv|eccv|neurips|icml|aaai", "顶会 (CCF A)"),
+    (r"arxiv", "预印本 (ArXiv)"),
+]
+DEFAULT_VENUE_LEVEL = "普通"
+
+# 14. 论文库: 每次的抓取结果按 DOI / URL 合并进本地 SQLite (跨运行累积、去重)，可按关键词 / 年份 / 等级查询
+STORE_FILE = os.path.join(OUTPUT_DIR, 'papers.db')   # 设为 None 不保存
+REPORT_FROM_STORE = True    # True: 报表包含本次关键词在库中的全部历史论文；False: 只用本次抓取的结果
+
+# 15. 导出设置
+EXCEL_STREAMING = True      # Excel 用 openpyxl write-only 模式逐行写出 (数据量大时更快、更省内存)；False 使用 DataFrame.to_excel
+EXTRA_EXPORTS = []          # 同时导出的其他格式 (与 Excel 同名): "csv" / "parquet" (parquet 需要安装 pyarrow)
+
 # 确保输出目录存在
 if not os.path.exists(OUTPUT_DIR):
     os.makedirs(OUTPUT_DIR)
@@ -60,335 +160,1149 @@ if not os.path.exists(OUTPUT_DIR):
 #                  模块 1: 辅助函数 (提取、检测、翻译)
 # ==============================================================================
 
-def extract_details(page, url):
+# ---------------- 详情页提取规则 ----------------
+
+DOI_PATTERN = re.compile(r'(10\.\d{4,9}/[-._;()/:A-Z0-9]+)', re.IGNORECASE)
+DOI_META_SELECTORS = ['meta[name="citation_doi"]', 'meta[name="dc.identifier"]',
+                      'meta[name="prism.doi"]', 'meta[property="og:url"]']
+
+# 各网站 (按域名后缀匹配) 的摘要规则，新增出版社只需在这里加一条:
+#   abstract: CSS 选择器，取页面中第一个匹配元素的文本
+#   heading:  摘要没有专门容器的网站，取文字含 "Abstract" 的该标题后紧跟的 <p>
+EXTRACTOR_RULES = {
+    "arxiv.org": {"abstract": "blockquote.abstract"},
+    "thecvf.com": {"abstract": "div#abstract"},
+    "proceedings.neurips.cc": {"abstract": "div.abstract, .abstract-container, p.abstract", "heading": "h4"},
+    "proceedings.mlr.press": {"abstract": "div.abstract, .abstract-container, p.abstract", "heading": "h4"},
+    "springer.com": {"abstract": "#Abs1-content, .c-article-section__content, .abstract-content"},
+    "nature.com": {"abstract": "#Abs1-content, .c-article-section__content, .abstract-content"},
+    "sciencedirect.com": {"abstract": "div.abstract.author, div#abstracts"},
+    "ieee.org": {"abstract": "div.abstract-text, div.u-mb-1 div"},
+    "acm.org": {"abstract": ".abstractSection, div[role='paragraph']"},
+    "openreview.net": {"abstract": "span.note-content-value"},
+}
+
+# 在页面内一次性执行全部规则，只把需要的几段文本传回 Python (代替逐个 query_selector 往返)
+EXTRACT_JS = """
+(rule) => {
+    const text = el => el ? (el.innerText || el.textContent || '').trim() : '';
+    const attr = sel => { const el = document.querySelector(sel); return el ? el.getAttribute('content') || '' : ''; };
+    const out = {doi: rule.doi.map(attr), abstract: '', description: '', body: ''};
+    if (rule.abstract) out.abstract = text(document.querySelector(rule.abstract));
+    if (!out.abstract && rule.heading) {
+        const h = [...document.querySelectorAll(rule.heading)].find(el => el.textContent.includes('Abstract'));
+        const p = h && h.nextElementSibling;
+        if (p && p.tagName === 'P') out.abstract = text(p);
+    }
+    if (out.abstract.length < 50) {
+        const desc = document.querySelector('meta[name="description"]') || document.querySelector('meta[property="og:description"]');
+        out.description = desc ? (desc.getAttribute('content') || '').trim() : '';
+        const body = document.body ? document.body.innerText : '';
+        const idx = body.indexOf('Abstract');
+        if (idx !== -1) out.body = body.slice(idx, idx + 1500);
+    }
+    return out;
+}
+"""
+
+def extractor_rule(host):
+    return next((r for suffix, r in EXTRACTOR_RULES.items() if host == suffix or host.endswith("." + suffix)), {})
+
+async def extract_details(page, url):
     """ 
-    增强版详情提取：支持 ArXiv, CVF, NeurIPS, Springer, ACM, IEEE 等主流来源 
+    增强版详情提取：支持 ArXiv, CVF, NeurIPS, Springer, ACM, IEEE 等主流来源 (规则见 EXTRACTOR_RULES)
     """
-    domain = url.lower()
-    content = ""
+    rule = extractor_rule(get_domain(url))
     doi = ""
-    
-    # --- 1. DOI 提取逻辑 ---
-    try:
-        doi_selectors = [
-            'meta[name="citation_doi"]', 'meta[name="dc.identifier"]', 
-            'meta[name="prism.doi"]', 'meta[property="og:url"]'
-        ]
-        for sel in doi_selectors:
-            meta = page.query_selector(sel)
-            if meta:
-                val = meta.get_attribute("content")
-                if val and "10." in val:
-                    match = re.search(r'(10\.\d{4,9}/[-._;()/:A-Z0-9]+)', val, re.IGNORECASE)
-                    if match: 
-                        doi = match.group(1)
-                        break
-        if not doi:
-            match = re.search(r'(10\.\d{4,9}/[-._;()/:A-Z0-9]+)', url, re.IGNORECASE)
-            if match: doi = match.group(1)
-    except: pass
 
-    # --- 2. 摘要提取逻辑 ---
     try:
-        if "arxiv.org" in domain:
-            elem = page.query_selector("blockquote.abstract")
-            if elem: content = elem.inner_text().replace("Abstract:", "").strip()
-        elif "thecvf.com" in domain:
-            elem = page.query_selector("div#abstract")
-            if elem: content = elem.inner_text().strip()
-        elif "proceedings.neurips.cc" in domain or "proceedings.mlr.press" in domain:
-            elem = page.query_selector("div.abstract, .abstract-container, p.abstract")
-            if not elem:
-                try: content = page.locator("h4:text('Abstract') + p").inner_text()
-                except: pass
-            else: content = elem.inner_text()
-        elif "springer.com" in domain or "nature.com" in domain:
-            elem = page.query_selector("#Abs1-content, .c-article-section__content, .abstract-content")
-            if elem: content = elem.inner_text()
-        elif "sciencedirect.com" in domain:
-            elem = page.query_selector("div.abstract.author, div#abstracts")
-            if elem: content = elem.inner_text()
-        elif "ieee.org" in domain:
-            elem = page.query_selector("div.abstract-text, div.u-mb-1 div")
-            if elem: 
-                text = elem.inner_text().strip()
-                if text.lower().startswith("abstract"): text = text[8:].strip(" :")
-                content = text
-        elif "acm.org" in domain:
-            elem = page.query_selector(".abstractSection, div[role='paragraph']")
-            if elem: content = elem.inner_text()
-        elif "openreview.net" in domain:
-            elem = page.query_selector("span.note-content-value")
-            if elem: content = elem.inner_text()
-
-        # --- 3. 通用兜底 ---
-        if not content or len(content) < 50:
-            meta_desc = page.query_selector('meta[name="description"]') or page.query_selector('meta[property="og:description"]')
-            if meta_desc:
-                desc_text = meta_desc.get_attribute('content').strip()
-                if len(desc_text) > 50 and "10." not in desc_text[:20]: content = desc_text
-            
-            if not content:
-                try:
-                    body_text = page.inner_text("body")
-                    idx = body_text.find("Abstract")
-                    if idx != -1:
-                        snippet = body_text[idx:idx+1500]
-                        lines = [line.strip() for line in snippet.split('\n') if len(line.strip()) > 50]
-                        if lines: content = lines[0]
-                except: pass
-
+        found = await page.evaluate(EXTRACT_JS, {"doi": DOI_META_SELECTORS, **rule})
     except Exception as e:
         print(f"Error parsing {url}: {e}")
+        found = {}
+
+    # --- 1. DOI: 依次检查 meta 标签，最后从 URL 中匹配 ---
+    for val in found.get("doi", []):
+        match = DOI_PATTERN.search(val) if "10." in val else None
+        if match:
+            doi = match.group(1)
+            break
+    if not doi:
+        match = DOI_PATTERN.search(url)
+        if match: doi = match.group(1)
+
+    # --- 2. 摘要 ---
+    content = found.get("abstract", "")
+
+    # --- 3. 通用兜底: description 标签，再找正文中 Abstract 之后的第一段长文本 ---
+    if len(content) < 50:
+        desc_text = found.get("description", "")
+        if len(desc_text) > 50 and "10." not in desc_text[:20]: content = desc_text
+
+        if not content:
+            lines = [line.strip() for line in found.get("body", "").split('\n') if len(line.strip()) > 50]
+            if lines: content = lines[0]
 
     # --- 4. 清洗 ---
+    return clean_abstract(content), doi
+
+def clean_abstract(content):
+    """ 合并空白、去掉开头的 Abstract 字样；过短或明显不是摘要的内容视为未找到 """
     if content:
         content = re.sub(r'\s+', ' ', content).strip()
         if content.lower().startswith("abstract"): content = content[8:].strip(" :-")
             
     if len(content) < 20 or content.startswith("http") or content.startswith("10."):
         content = "未找到有效摘要"
+    return content
+
+# ---------------- 免浏览器快速通道 ----------------
+
+CHALLENGE_PATTERN = re.compile(r'just a moment|verify you are human|cf-chl-|/sorry/|<title>[^<]*captcha', re.IGNORECASE)
+
+# 摘要不在 meta 标签里的网站: 直接从原始 HTML 中截取指定元素 (标签, 属性, 属性值) 的文本
+FAST_SELECTORS = {
+    "arxiv.org": ("blockquote", "class", "abstract"),
+    "thecvf.com": ("div", "id", "abstract"),
+}
+
+class MetaTagParser(HTMLParser):
+    """ 收集所有 meta 标签 (name/property -> content)，并截取第一个目标元素的文本 """
+    def __init__(self, target=None):
+        super().__init__(convert_charrefs=True)
+        self.meta = {}
+        self.target = target
+        self.depth = 0          # >0 表示正处于目标元素内部
+        self.text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            attrs = dict(attrs)
+            key = (attrs.get("name") or attrs.get("property") or "").lower()
+            if key and attrs.get("content") and key not in self.meta:
+                self.meta[key] = attrs["content"]
+        elif self.depth:
+            if tag == self.target[0]: self.depth += 1
+        elif self.target and tag == self.target[0]:
+            value = dict(attrs).get(self.target[1]) or ""
+            if self.target[2] in value.split(): self.depth = 1
+
+    def handle_endtag(self, tag):
+        if self.depth and tag == self.target[0]:
+            self.depth -= 1
+            if not self.depth: self.target = None   # 只取第一个匹配的元素
+
+    def handle_data(self, data):
+        if self.depth: self.text.append(data)
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session():
+    """ 所有快速请求共用一个带连接池的 keep-alive 会话 """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=FAST_FETCH_POOL, pool_maxsize=FAST_FETCH_POOL)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({
+                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                              "(KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+                "Accept-Language": "en-US,en;q=0.9",
+            })
+            if PROXIES: session.proxies.update(PROXIES)
+            _http_session = session
+        return _http_session
+
+def fetch_details_fast(url):
+    """
+    不启动浏览器，直接请求原始 HTML 并解析 citation_doi / citation_abstract 等 meta 标签。
+    返回 (abstract, doi)；请求失败、遇到验证页或拿不到有效摘要时返回 None，由浏览器兜底。
+    """
+    try:
+        resp = get_http_session().get(url, timeout=FAST_FETCH_TIMEOUT)
+    except requests.RequestException:
+        return None
+    if resp.status_code != 200 or "html" not in resp.headers.get("Content-Type", "text/html"):
+        return None
+    html = resp.text
+    if CHALLENGE_PATTERN.search(html[:20000]):
+        return None
 
+    host = get_domain(resp.url)
+    target = next((sel for suffix, sel in FAST_SELECTORS.items() if host == suffix or host.endswith("." + suffix)), None)
+    if target is None:
+        # 只需要 meta 标签时解析到 </head> 为止
+        head_end = html.find("</head>")
+        if head_end != -1: html = html[:head_end]
+    parser = MetaTagParser(target)
+    try:
+        parser.feed(html)
+    except Exception:
+        return None
+    meta = parser.meta
+
+    doi = ""
+    for key in ("citation_doi", "dc.identifier", "prism.doi", "og:url"):
+        val = meta.get(key, "")
+        match = DOI_PATTERN.search(val) if "10." in val else None
+        if match:
+            doi = match.group(1)
+            break
+    if not doi:
+        match = DOI_PATTERN.search(resp.url) or DOI_PATTERN.search(url)
+        if match: doi = match.group(1)
+
+    content = "".join(parser.text).strip()
+    if len(content) < 50:
+        content = meta.get("citation_abstract") or meta.get("dc.description") or ""
+    if len(content) < 50:
+        desc = (meta.get("description") or meta.get("og:description") or "").strip()
+        if len(desc) > 50 and "10." not in desc[:20]: content = desc
+    content = clean_abstract(content)
+    if content == "未找到有效摘要":
+        return None
     return content, doi
 
-def check_google_captcha_blocking(page):
+CAPTCHA_LOCK = asyncio.Lock()
+
+async def check_google_captcha_blocking(page):
     """ Google 反爬拦截检测 """
     try:
         if "/sorry/" in page.url: is_blocked = True
         else:
-            text = page.inner_text("body").lower()
-            is_blocked = "unusual traffic" in text or "异常流量" in text or "robot" in page.title().lower()
+            text = (await page.inner_text("body")).lower()
+            is_blocked = "unusual traffic" in text or "异常流量" in text or "robot" in (await page.title()).lower()
 
         if is_blocked:
-            print("\n🚨🚨🚨 触发 Google 拦截！(检测到异常流量)")
-            print("1. 请在自动打开的浏览器中手动完成验证码。")
-            print("2. 完成后，请在终端按【回车】继续程序。")
-            page.bring_to_front() # 把页面置顶
-            input() 
+            async with CAPTCHA_LOCK: # 多个搜索窗口同时被拦截时逐个处理
+                print("\n🚨🚨🚨 触发 Google 拦截！(检测到异常流量)")
+                print("1. 请在自动打开的浏览器中手动完成验证码。")
+                print("2. 完成后，请在终端按【回车】继续程序。")
+                await page.bring_to_front() # 把页面置顶
+                await asyncio.to_thread(input) # 等待回车时不阻塞其他页面的抓取
             return True
     except: pass
     return False
 
-def is_target_captcha(page):
+async def is_target_captcha(page):
     """ 目标论文网站的反爬检测 (Cloudflare等) """
     try:
-        title = page.title().lower()
-        body = page.inner_text("body").lower()
+        title = (await page.title()).lower()
+        body = (await page.inner_text("body")).lower()
         if "just a moment" in title or "verify you are human" in title or "captcha" in body:
             return True
     except: pass
     return False
 
-def rate_venue(venue_text):
-    """ 期刊评级 """
-    if not isinstance(venue_text, str): return "未知", "未知"
-    venue_lower = venue_text.lower()
-    clean_name = venue_text
-    try:
-        parts = venue_text.split(" - ")
-        if len(parts) >= 2:
-            clean_name = parts[-2]
-            clean_name = re.sub(r'\d{4}', '', clean_name).strip().strip(',')
-    except: pass
+# "作者 - 期刊, 年份 - 网站" 形式时取倒数第二段作为期刊名
+VENUE_NAME_PATTERN = r'^(?:.* - )?(.*?) - (?:(?! - ).)*$'
 
-    level = "普通"
-    if "ieee trans" in venue_lower or "acm trans" in venue_lower: level = "顶刊 (Trans)"
-    elif "nature" in venue_lower or "science" in venue_lower: level = "神刊"
-    elif any(x in venue_lower for x in ["cvpr", "iccv", "eccv", "neurips", "icml", "aaai"]): level = "顶会 (CCF A)"
-    elif "arxiv" in venue_lower: level = "预印本 (ArXiv)"
+def rate_venues(venues):
+    """
+    期刊评级 (向量化)：返回 (Clean_Venue, Level) 两列 category，非文本记为 "未知"。
+    同一 venue 在多关键词结果中大量重复，规则只在去重后的取值上执行一次，再按编码映射回每一行。
+    """
+    codes, uniques = pd.factorize(venues.astype(object))
+    text = pd.Series(uniques, dtype=object)
+    is_text = text.map(lambda v: isinstance(v, str)).astype(bool)
+    text = text.where(is_text, "")
+
+    names = text.str.extract(VENUE_NAME_PATTERN, expand=False)
+    names = names.str.replace(r'\d{4}', '', regex=True).str.strip().str.strip(',')
+    clean = names.fillna(text).where(is_text, "未知").to_numpy(dtype=object)
+
+    conditions = [text.str.contains(pattern, case=False, regex=True).to_numpy(dtype=bool) for pattern, _ in VENUE_LEVELS]
+    level = np.select(conditions, [lvl for _, lvl in VENUE_LEVELS], default=DEFAULT_VENUE_LEVEL).astype(object)
+    level[~is_text.to_numpy()] = "未知"
+    categories = list(dict.fromkeys([lvl for _, lvl in VENUE_LEVELS] + [DEFAULT_VENUE_LEVEL, "未知"]))
 
-    return clean_name, level
+    # 缺失值的编码是 -1，正好取到末尾追加的 "未知"
+    clean, level = np.append(clean, "未知")[codes], np.append(level, "未知")[codes]
+    return (pd.Series(clean, index=venues.index, dtype="category"),
+            pd.Series(pd.Categorical(level, categories=categories), index=venues.index))
+
+# ---------------- 翻译引擎 ----------------
+
+_translator_local = threading.local()
+
+def google_backend(texts, target):
+    """
+    把多条文本用换行拼成一次请求 (deep-translator 的 translate_batch 是逐条请求)，
+    返回的行数对不上时退回 translate_batch 逐条翻译
+    """
+    translator = getattr(_translator_local, target, None)
+    if translator is None:
+        translator = GoogleTranslator(source='auto', target=target, proxies=PROXIES)
+        setattr(_translator_local, target, translator)
+    if len(texts) == 1:
+        return [translator.translate(texts[0])]
+    lines = translator.translate("\n".join(texts)).split("\n")
+    if len(lines) == len(texts):
+        return [line.strip() for line in lines]
+    return translator.translate_batch(texts)
+
+def stub_backend(texts, target):
+    """ 离线占位翻译: 不联网，原样加上语言标记 """
+    return [f"[{target}] {text}" for text in texts]
+
+TRANSLATION_BACKENDS = {"google": google_backend, "stub": stub_backend}
+
+class TranslationEngine:
+    """
+    批量翻译: 先查翻译记忆 (SQLite, 以 (原文, 目标语言) 的哈希为键)，未命中的文本去重后
+    按字符数打包成批，在线程池中并发请求，失败时指数退避重试。
+    """
+    def __init__(self, target='zh-CN', backend=None, memory_file=TRANSLATION_MEMORY_FILE):
+        self.target = target
+        self.backend = TRANSLATION_BACKENDS[backend or TRANSLATE_BACKEND]
+        self.conn = None
+        if memory_file:
+            self.conn = sqlite3.connect(memory_file)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS memory (key TEXT PRIMARY KEY, translation TEXT)")
+        self.memory_hits = 0
+
+    def key(self, text):
+        return hashlib.sha1(f"{self.target}\0{text}".encode('utf-8')).hexdigest()
+
+    def lookup(self, texts):
+        if not self.conn or not texts: return {}
+        found, keys = {}, {self.key(t): t for t in texts}
+        key_list = list(keys)
+        for i in range(0, len(key_list), 500):
+            chunk = key_list[i:i + 500]
+            rows = self.conn.execute(f"SELECT key, translation FROM memory WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            for key, translation in rows:
+                found[keys[key]] = translation
+        return found
+
+    def make_batches(self, texts):
+        batches, current, size = [], [], 0
+        for text in texts:
+            if current and size + len(text) + 1 > TRANSLATE_BATCH_CHARS:
+                batches.append(current)
+                current, size = [], 0
+            current.append(text)
+            size += len(text) + 1
+        if current: batches.append(current)
+        return batches
+
+    def translate_batch(self, texts):
+        for attempt in range(TRANSLATE_RETRIES + 1):
+            try:
+                result = self.backend(texts, self.target)
+                if len(result) == len(texts) and all(isinstance(r, str) for r in result):
+                    return result
+            except Exception:
+                pass
+            if attempt < TRANSLATE_RETRIES:
+                time.sleep(2 ** attempt + random.uniform(0, 1))
+        return None
+
+    def translate_many(self, texts, desc="Translating"):
+        """ 翻译一组文本，返回与输入一一对应的译文列表 (无需翻译的返回空字符串，失败返回 [翻译出错]) """
+        sources = {}
+        for text in texts:
+            if not text or not isinstance(text, str) or len(text) < 5 or text in ("未找到", "未找到有效摘要"):
+                continue
+            # 合并请求依赖换行分隔，单条文本内部的换行先替换为空格
+            sources[text] = " ".join(text[:4000].split())
+
+        translated = self.lookup(set(sources.values()))
+        self.memory_hits += len(translated)
+        todo = [t for t in dict.fromkeys(sources.values()) if t not in translated]
+        batches = self.make_batches(todo)
+
+        with ThreadPoolExecutor(max_workers=TRANSLATE_WORKERS) as pool:
+            for batch, result in tqdm(zip(batches, pool.map(self.translate_batch, batches)), total=len(batches), desc=desc):
+                if result is None:
+                    translated.update((text, "[翻译出错]") for text in batch)
+                    continue
+                translated.update(zip(batch, result))
+                if self.conn:
+                    self.conn.executemany("INSERT OR REPLACE INTO memory VALUES (?, ?)",
+                                          [(self.key(t), r) for t, r in zip(batch, result)])
+                    self.conn.commit()
+        return [translated.get(sources[text], "") if text in sources else "" for text in texts]
+
+    def close(self):
+        if self.conn: self.conn.close()
 
 def translate_text(text, target='zh-CN'):
-    """ 谷歌翻译 """
-    if not text or len(text) < 5 or text == "未找到" or text == "未找到有效摘要": return ""
+    """ 翻译单条文本 (批量场景请直接使用 TranslationEngine.translate_many) """
+    engine = TranslationEngine(target)
     try:
-        translator = GoogleTranslator(source='auto', target=target, proxies=PROXIES)
-        res = translator.translate(text[:4000])
-        time.sleep(0.2)
-        return res
-    except: return "[翻译出错]"
+        return engine.translate_many([text], desc="Translating")[0]
+    finally:
+        engine.close()
+
+# ---------------- 本地缓存 ----------------
+
+class CrawlCache:
+    """
+    按 URL 缓存抓取结果: 列表页存解析后的论文条目，详情页存 (abstract, doi)。
+    内容以 zlib 压缩的 JSON 存在 SQLite 中；过期条目视为未命中，容量超限时按最近使用时间淘汰。
+    只在事件循环所在线程中使用。
+    """
+    def __init__(self, db_path, ttl_days=7, max_mb=200):
+        self.ttl = ttl_days * 86400
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = self.misses = 0
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY, payload BLOB, size INTEGER, fetched_at REAL, last_used REAL)""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_last_used ON pages(last_used)")
+
+    def get(self, url):
+        row = self.conn.execute("SELECT payload, fetched_at FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute("UPDATE pages SET last_used = ? WHERE url = ?", (time.time(), url))
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, url, value):
+        payload = zlib.compress(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+        now = time.time()
+        self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", (url, payload, len(payload), now, now))
+        self.conn.commit()
+
+    def close(self):
+        """ 删除过期条目，超出容量时从最久未使用的开始淘汰 """
+        try:
+            self.conn.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - self.ttl,))
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                for url, size in self.conn.execute("SELECT url, size FROM pages ORDER BY last_used").fetchall():
+                    self.conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                    excess -= size
+                    if excess <= 0: break
+            self.conn.commit()
+        finally:
+            self.conn.close()
+
+# ---------------- 断点续爬 ----------------
+
+class CrawlCheckpoint:
+    """
+    追加写入的抓取进度 (JSONL)，每行一条记录:
+      {"type": "list", "keyword", "offset", "next_offset", "count", "items"}
+                                                               一页搜索结果 (items 为本页新增的任务)
+      {"type": "keyword_done", "keyword"}                      关键词的列表采集完成
+      {"type": "detail", ...任务字段, "doi", "abstract"}       一篇论文的详情结果
+      {"type": "finished"}                                     整轮抓取完成，下次运行重新开始
+    """
+    def __init__(self, path):
+        self.path = path
+        self.tasks = []         # 已采集的任务 (按记录顺序)
+        self.keywords = {}      # keyword -> {"offset": 下一页偏移, "count": 已采集数, "done": bool}
+        self.details = {}       # url -> 详情结果
+        self.load()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def load(self):
+        if not os.path.exists(self.path): return
+        records = []
+        with open(self.path, 'rb+') as f:
+            for line in f:
+                try: records.append(json.loads(line))
+                except ValueError: pass     # 中断时写了一半的最后一行
+            # 截掉写了一半的最后一行，之后追加的记录才会从新的一行开始
+            f.seek(0)
+            data = f.read()
+            f.truncate(data.rfind(b"\n") + 1)
+        if not records or records[-1].get("type") == "finished":
+            # 上一轮已完整结束，从头开始新的一轮
+            os.remove(self.path)
+            return
+        for rec in records:
+            kind = rec.get("type")
+            if kind == "list":
+                self.tasks.extend(rec["items"])
+                # next_offset 由写入时的翻页步长 (10 或 20) 决定; 旧断点没有该字段时按 10 条一页
+                next_offset = rec.get("next_offset", rec["offset"] + 10)
+                self.keywords[rec["keyword"]] = {"offset": next_offset, "count": rec["count"], "done": False}
+            elif kind == "keyword_done":
+                self.keywords.setdefault(rec["keyword"], {"offset": 0, "count": 0})["done"] = True
+            elif kind == "detail":
+                self.details[rec["url"]] = {k: v for k, v in rec.items() if k != "type"}
+        print(f"   ⏯️  从断点恢复: 已采集 {len(self.tasks)} 篇任务，已完成详情 {len(self.details)} 篇")
+
+    def log(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def finish(self):
+        self.log({"type": "finished"})
+        self.file.close()
+
+# ---------------- 论文库 ----------------
+
+# 抓取失败时的占位内容，合并时不会覆盖库中已有的摘要
+ABSTRACT_PLACEHOLDERS = ("未找到", "未找到有效摘要", "访问异常", "验证码拦截 (已跳过)")
+
+class PaperStore:
+    """
+    跨运行累积的论文库 (SQLite)。同一篇论文按 URL 或 DOI 识别: 已有的更新，新的插入；
+    抓取失败的结果不会覆盖之前抓到的摘要和 DOI，keyword 保留首次发现时的关键词。
+    一篇论文在哪些关键词下出现过记在 paper_keywords 中，按关键词查询走这张表，
+    之后换关键词再次搜到的论文也能查出来。keyword / year / level 建有索引，query() 直接读成 DataFrame。
+    """
+    COLUMNS = ['keyword', 'title', 'url', 'venue', 'year', 'doi', 'abstract']
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS papers (
+                id INTEGER PRIMARY KEY, keyword TEXT, title TEXT, url TEXT UNIQUE, venue TEXT, year TEXT,
+                doi TEXT, abstract TEXT, level TEXT, first_seen REAL, last_seen REAL);
+            CREATE INDEX IF NOT EXISTS idx_papers_doi ON papers(doi);
+            CREATE INDEX IF NOT EXISTS idx_papers_keyword ON papers(keyword, year);
+            CREATE INDEX IF NOT EXISTS idx_papers_year ON papers(year);
+            CREATE INDEX IF NOT EXISTS idx_papers_level ON papers(level);
+            CREATE TABLE IF NOT EXISTS paper_keywords (
+                paper_id INTEGER, keyword TEXT, PRIMARY KEY (paper_id, keyword));
+            CREATE INDEX IF NOT EXISTS idx_paper_keywords_keyword ON paper_keywords(keyword);
+        """)
+        # 旧版本的库只有 papers.keyword，补齐关键词归属
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO paper_keywords SELECT id, keyword FROM papers WHERE keyword IS NOT NULL")
+
+    def upsert(self, records):
+        """ 合并一批抓取结果，返回 (新增数, 更新数) """
+        if not records: return 0, 0
+        _, levels = rate_venues(pd.Series([r.get('venue') for r in records], dtype=object))
+        now = time.time()
+        added = updated = 0
+        with self.conn:
+            for r, level in zip(records, levels):
+                doi = r.get('doi') or ""
+                if not DOI_PATTERN.fullmatch(doi): doi = ""
+                abstract = r.get('abstract') or ""
+                if doi:
+                    row = self.conn.execute("SELECT id, doi, abstract FROM papers WHERE url = ? OR doi = ? LIMIT 1",
+                                            (r['url'], doi)).fetchone()
+                else:
+                    row = self.conn.execute("SELECT id, doi, abstract FROM papers WHERE url = ?", (r['url'],)).fetchone()
+                if row is None:
+                    self.conn.execute("INSERT INTO papers (keyword, title, url, venue, year, doi, abstract, level, first_seen, last_seen) "
+                                      "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                      (r.get('keyword'), r.get('title'), r['url'], r.get('venue'), r.get('year'),
+                                       doi, abstract, level, now, now))
+                    paper_id = self.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                    added += 1
+                else:
+                    if abstract in ABSTRACT_PLACEHOLDERS and row[2] and row[2] not in ABSTRACT_PLACEHOLDERS:
+                        abstract = row[2]
+                    self.conn.execute("UPDATE papers SET title = ?, venue = ?, year = ?, doi = ?, abstract = ?, "
+                                      "level = ?, last_seen = ? WHERE id = ?",
+                                      (r.get('title'), r.get('venue'), r.get('year'), doi or row[1], abstract,
+                                       level, now, row[0]))
+                    paper_id = row[0]
+                    updated += 1
+                if r.get('keyword'):
+                    self.conn.execute("INSERT OR IGNORE INTO paper_keywords VALUES (?, ?)", (paper_id, r['keyword']))
+        return added, updated
+
+    def query(self, keywords=None, years=None, levels=None):
+        """
+        按关键词列表 / 年份区间 (起, 止) / 等级列表查询，按入库顺序返回 DataFrame。
+        按关键词查询时，论文在其中任一关键词下出现过即返回；keyword 列优先取首次发现时的关键词，
+        不在查询列表中时换成列表里它出现过的关键词，报表统计不会落到查询范围之外。
+        """
+        columns, where, params = list(self.COLUMNS), [], []
+        if keywords:
+            keywords = list(keywords)
+            marks = ', '.join('?' * len(keywords))
+            columns[0] = (f"CASE WHEN keyword IN ({marks}) THEN keyword ELSE (SELECT MIN(pk.keyword) FROM paper_keywords pk "
+                          f"WHERE pk.paper_id = papers.id AND pk.keyword IN ({marks})) END AS keyword")
+            params += keywords + keywords
+            where.append(f"id IN (SELECT paper_id FROM paper_keywords WHERE keyword IN ({marks}))")
+            params += keywords
+        if years:
+            where.append("year GLOB '[0-9][0-9][0-9][0-9]' AND year BETWEEN ? AND ?")
+            params += [str(years[0]), str(years[1])]
+        if levels:
+            where.append(f"level IN ({', '.join('?' * len(levels))})")
+            params += list(levels)
+        sql = f"SELECT {', '.join(columns)} FROM papers"
+        if where: sql += " WHERE " + " AND ".join(where)
+        return pd.read_sql_query(sql + " ORDER BY id", self.conn, params=params)
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+# ---------------- 自适应限速 ----------------
+
+class _Bucket:
+    def __init__(self, rate, max_rate, burst):
+        self.rate, self.max_rate, self.burst = rate, max_rate, burst
+        self.tokens, self.updated = float(burst), time.monotonic()
+        self.blocked_until = 0.0
+        self.strikes = 0            # 连续受阻次数，决定退避时长
+        self.requests = self.penalties = 0
+        self.first_request = None
+        # 排队: 至少有一个请求在等待令牌的时长 (多个请求同时等待只算一次)；退避: penalize() 实际延长的暂停时长
+        self.waited = self.blocked = 0.0
+        self.waiters = 0
+        self.wait_since = 0.0
+
+class HostRateLimiter:
+    """
+    按网站分别限速的令牌桶 (asyncio)。success() 时速率线性增加直到上限，
+    penalize() (验证码 / 超时) 时速率减半并暂停 BACKOFF_BASE * 2^n 秒。
+    记录每个网站的请求数、每分钟请求数、排队等待与退避耗时。
+    """
+    def __init__(self, name=""):
+        self.name = name            # 多个搜索窗口各有一个限速器，统计时区分
+        self.buckets = {}
+
+    def bucket(self, host):
+        if host not in self.buckets:
+            rate, max_rate = next((r for suffix, r in RATE_LIMITS.items()
+                                   if host == suffix or host.endswith("." + suffix)), DEFAULT_RATE)
+            self.buckets[host] = _Bucket(rate, max_rate, RATE_BURST)
+        return self.buckets[host]
+
+    async def acquire(self, host):
+        b = self.bucket(host)
+        waiting = False
+        try:
+            while True:
+                now = time.monotonic()
+                if now < b.blocked_until:
+                    wait = b.blocked_until - now
+                else:
+                    b.tokens = min(b.burst, b.tokens + (now - b.updated) * b.rate)
+                    b.updated = now
+                    if b.tokens >= 1:
+                        b.tokens -= 1
+                        b.requests += 1
+                        if b.first_request is None: b.first_request = now
+                        return
+                    # 加一点随机抖动，避免请求间隔过于规律
+                    wait = (1 - b.tokens) / b.rate * random.uniform(1.0, 1.3)
+                if not waiting:
+                    waiting = True
+                    if not b.waiters: b.wait_since = now
+                    b.waiters += 1
+                await asyncio.sleep(wait)
+        finally:
+            if waiting:
+                b.waiters -= 1
+                if not b.waiters: b.waited += time.monotonic() - b.wait_since
+
+    def success(self, host):
+        b = self.bucket(host)
+        b.strikes = 0
+        b.rate = min(b.max_rate, b.rate + b.max_rate * 0.1)
+
+    def penalize(self, host, reason=""):
+        b = self.bucket(host)
+        b.penalties += 1
+        b.rate = max(MIN_RATE, b.rate / 2)
+        backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** b.strikes)
+        b.strikes += 1
+        now = time.monotonic()
+        until = max(b.blocked_until, now + backoff)
+        # 退避时长在这里按实际延长的部分记一次，不随等待中的请求数重复累计
+        b.blocked += until - max(b.blocked_until, now)
+        b.blocked_until = until
+        # 令牌从退避结束时才开始重新累积，恢复后不会立刻突发请求
+        b.tokens, b.updated = 0.0, b.blocked_until
+        print(f"\n   🐢 {host} {reason}，降速至 {b.rate:.2f} 次/秒并暂停 {backoff:.0f} 秒")
+
+    def report(self):
+        if not self.buckets: return
+        print(f"   📈 请求统计 (每个网站){' - ' + self.name if self.name else ''}:")
+        for host, b in sorted(self.buckets.items(), key=lambda kv: -kv[1].requests):
+            minutes = max(time.monotonic() - b.first_request, 1.0) / 60 if b.first_request else 1.0
+            print(f"      - {host}: {b.requests} 次 ({b.requests / minutes:.1f} 次/分钟), 当前 {b.rate:.2f} 次/秒, "
+                  f"排队 {b.waited:.0f} 秒 (含退避), 受阻 {b.penalties} 次 / 退避 {b.blocked:.0f} 秒")
+
+# ---------------- 请求拦截 ----------------
+
+def _host_in(host, suffixes):
+    return any(host == suffix or host.endswith("." + suffix) for suffix in suffixes)
+
+def _site(host):
+    """ 粗略取主域名 (最后两段)，用来判断脚本是否属于本站 """
+    return ".".join(host.split(".")[-2:])
+
+class ResourceBlocker:
+    """
+    详情页请求拦截 (page.route)。按 RESOURCE_RULES / BLOCKED_HOSTS / BLOCKED_RESOURCE_TYPES 判断，
+    被拦截的请求不会下载。统计的都是实测值: 各类资源的拦截次数，以及放行的请求实际传输的字节数 (request.sizes())。
+    """
+    def __init__(self):
+        self.blocked = {}           # 资源类型 -> 拦截次数
+        self.finished = 0           # 完成的请求数
+        self.transferred = 0        # 完成的请求实际传输的字节数 (响应头 + 响应体)
+
+    def should_block(self, resource_type, request_host, page_host):
+        rule = next((r for suffix, r in RESOURCE_RULES.items() if _host_in(page_host, [suffix])), {})
+        if _host_in(request_host, rule.get("deny", [])) or _host_in(request_host, BLOCKED_HOSTS): return True
+        if resource_type in BLOCKED_RESOURCE_TYPES: return True
+        if not BLOCK_THIRD_PARTY_SCRIPTS or resource_type != "script": return False
+        return _site(request_host) != _site(page_host) and not _host_in(request_host, rule.get("allow", []))
+
+    async def attach(self, page):
+        async def _handle(route, request):
+            if request.resource_type != "document" and \
+                    self.should_block(request.resource_type, get_domain(request.url), get_domain(page.url)):
+                self.blocked[request.resource_type] = self.blocked.get(request.resource_type, 0) + 1
+                await route.abort("blockedbyclient")
+            else:
+                await route.continue_()
+
+        async def _finished(request):
+            try:
+                sizes = await request.sizes()
+            except Exception:
+                return              # 页面已关闭等情况下取不到大小，不计入
+            self.finished += 1
+            self.transferred += sizes["responseHeadersSize"] + max(sizes["responseBodySize"], 0)
+
+        await page.route("**/*", _handle)
+        page.on("requestfinished", _finished)
+
+    def report(self, pages):
+        pages = max(pages, 1)
+        if self.blocked:
+            total = sum(self.blocked.values())
+            detail = " / ".join(f"{kind} {n}" for kind, n in sorted(self.blocked.items(), key=lambda kv: -kv[1]))
+            print(f"   🧱 请求拦截: 共 {total} 个 ({detail})，平均每页 {total / pages:.1f} 个")
+        if self.finished:
+            print(f"   📶 实际传输: {self.finished} 个请求共 {self.transferred / 1024 / 1024:.1f} MB "
+                  f"(平均每页 {self.transferred / pages / 1024:.0f} KB)")
 
 # ==============================================================================
 #                  模块 2: 核心爬虫控制流程
 # ==============================================================================
 
+def get_domain(url):
+    return (urlparse(url).hostname or "").lower()
+
+def domain_limit(host):
+    """ 按域名后缀查找并发上限，未配置的网站使用 DOMAIN_CONCURRENCY """
+    for suffix, limit in DOMAIN_LIMITS.items():
+        if host == suffix or host.endswith("." + suffix): return limit
+    return DOMAIN_CONCURRENCY
+
+async def fetch_detail(page, task, limiter=None, acquire=True):
+    """
+    在给定页面上打开论文详情页，返回附带 doi / abstract 的结果；结果反馈给限速器。
+    acquire=False 表示调用方已为这篇论文取过令牌 (快速通道失败后的浏览器兜底)，不再重复计数。
+    """
+    abstract, doi = "未找到", "未找到"
+    host = get_domain(task['url'])
+    try:
+        if limiter and acquire: await limiter.acquire(host)
+        await page.goto(task['url'], timeout=DETAIL_TIMEOUT_MS, wait_until=DETAIL_WAIT_UNTIL)
+        # 代替固定的 2~4 秒等待: 摘要元素一出现就提取 (没有规则的网站等页面加载完成)，最多再等 DETAIL_READY_TIMEOUT
+        ready = extractor_rule(host).get("abstract")
+        try:
+            if ready: await page.wait_for_selector(ready, state="attached", timeout=DETAIL_READY_TIMEOUT)
+            else: await page.wait_for_load_state("load", timeout=DETAIL_READY_TIMEOUT)
+        except:
+            # commit 模式下至少要等 HTML 解析完，meta 标签才齐全
+            if DETAIL_WAIT_UNTIL == "commit":
+                try: await page.wait_for_load_state("domcontentloaded", timeout=DETAIL_TIMEOUT_MS)
+                except: pass
+
+        if await is_target_captcha(page):
+            abstract = "验证码拦截 (已跳过)"
+            if limiter: limiter.penalize(host, "出现验证码")
+        else:
+            abstract, doi = await extract_details(page, task['url'])
+            if limiter: limiter.success(host)
+    except Exception as e:
+        abstract = "访问异常"
+        if limiter and isinstance(e, PlaywrightTimeoutError): limiter.penalize(host, "加载超时")
+    return {**task, "doi": doi, "abstract": abstract}
+
+async def crawl_details(context, queue, cache=None, checkpoint=None, limiter=None):
+    """
+    并发抓取详情 (流水线的消费端): 从 queue 中不断取出列表阶段产出的 (序号, 论文)，
+    取到 None 表示列表采集结束。同一个持久化上下文中最多开 DETAIL_CONCURRENCY 个页面组成页面池，
+    每个网站再按 DOMAIN_LIMITS 限制并发，不同来源并行抓取而不会集中冲击同一个站点。
+    已缓存的 URL 直接复用，断点中已完成的论文直接跳过，返回 {序号: 结果}。
+    """
+    done = checkpoint.details if checkpoint else {}
+    results = {}
+    pages = asyncio.Queue()
+    opened = []
+    reserved = 0                # 已创建或正在创建的页面数
+    # 同时处理的论文数不超过队列容量，列表阶段领先太多时会在 queue.put 处等待
+    inflight = asyncio.Semaphore(DETAIL_QUEUE_SIZE)
+
+    blocker = ResourceBlocker() if BLOCK_RESOURCES else None
+
+    domain_slots = {}
+    fast_hits = 0
+    fetched = 0
+    progress = tqdm(total=0, desc="Deep Crawling")
+
+    async def _get_page():
+        # 页面按需创建，全部命中缓存 / 快速通道时不会多开浏览器标签页
+        nonlocal reserved
+        if pages.empty() and reserved < DETAIL_CONCURRENCY:
+            # 先占名额再 await new_page，同一批并发的协程不会一起越过上限
+            reserved += 1
+            try:
+                page = await context.new_page()
+                if blocker: await blocker.attach(page)
+            except:
+                reserved -= 1
+                raise
+            opened.append(page)
+            return page
+        return await pages.get()
+
+    async def _crawl(index, task):
+        nonlocal fast_hits, fetched
+        host = get_domain(task['url'])
+        if host not in domain_slots:
+            domain_slots[host] = asyncio.Semaphore(domain_limit(host))
+        # 先占网站名额再取页面，等待同一网站的任务不会占着空闲页面
+        cached = cache.get(task['url']) if cache else None
+        if cached:
+            results[index] = {**task, **cached}
+        else:
+            fetched += 1
+            async with domain_slots[host]:
+                fast = None
+                if FAST_FETCH:
+                    if limiter: await limiter.acquire(host)
+                    fast = await asyncio.to_thread(fetch_details_fast, task['url'])
+                if fast:
+                    fast_hits += 1
+                    results[index] = {**task, "doi": fast[1], "abstract": fast[0]}
+                else:
+                    page = await _get_page()
+                    try:
+                        results[index] = await fetch_detail(page, task, limiter, acquire=not FAST_FETCH)
+                    finally:
+                        pages.put_nowait(page)
+            # 访问异常 / 验证码拦截属于临时失败，不写入缓存
+            if cache and results[index]['abstract'] not in ("访问异常", "验证码拦截 (已跳过)"):
+                cache.put(task['url'], {"doi": results[index]['doi'], "abstract": results[index]['abstract']})
+        progress.update(1)
+
+        # 每篇完成后立即追加到断点文件 (代替每 10 篇整体重写一次 JSON)
+        if checkpoint: checkpoint.log({"type": "detail", **results[index]})
+
+    def _release(job):
+        inflight.release()
+        queue.task_done()
+
+    jobs = []
+    try:
+        while True:
+            await inflight.acquire()
+            item = await queue.get()
+            if item is None:
+                queue.task_done()
+                break
+            index, task = item
+            progress.total += 1
+            if task['url'] in done:
+                results[index] = done[task['url']]
+                progress.update(1)
+                _release(None)
+                continue
+            job = asyncio.create_task(_crawl(index, task))
+            job.add_done_callback(_release)
+            jobs.append(job)
+        await asyncio.gather(*jobs)
+    finally:
+        for job in jobs: job.cancel()
+        progress.close()
+        for page in opened:
+            try: await page.close()
+            except: pass
+    if FAST_FETCH and fetched:
+        print(f"   ⚡ 快速通道 (免浏览器) 完成 {fast_hits}/{fetched} 篇")
+    if blocker: blocker.report(fetched - fast_hits)
+    return results
+
+async def scrape_result_page(page, list_url, limiter=None):
+    """
+    打开一页 Scholar 搜索结果，解析出所有结果卡片 (title, url, venue, year)；没有结果时返回空列表。
+    三次都没能打开这一页时返回 None: 标签页里还是上一页的内容，不能解析也不能写入缓存。
+    """
+    host = get_domain(list_url)
+    retry = 0
+    while retry < 3:
+        if limiter: await limiter.acquire(host)
+        try:
+            await page.goto(list_url, timeout=TIMEOUT_MS)
+        except:
+            # 网络错误/超时不是被限流，不降速，稍等后重试
+            retry += 1
+            await asyncio.sleep(3)
+            continue
+        # 检测验证码 (人工验证后继续，但之后的请求放慢)；只有被拦截才降速
+        if await check_google_captcha_blocking(page):
+            if limiter: limiter.penalize(host, "触发验证码")
+        try:
+            await page.wait_for_selector("div.gs_r", timeout=30000)
+        except:
+            # 仍停在拦截页则重试；否则页面已正常加载但没有结果卡片，说明结果已到末页
+            if "/sorry/" in page.url:
+                retry += 1
+                continue
+            break
+        if limiter: limiter.success(host)
+        break
+    else:
+        return None
+
+    items = []
+    for card in await page.query_selector_all("div.gs_r.gs_or.gs_scl"):
+        link_el = await card.query_selector("h3.gs_rt a")
+        title_el = await card.query_selector("h3.gs_rt")
+        pub_el = await card.query_selector("div.gs_a")
+        if not (link_el and title_el): continue
+
+        venue, year = "Unknown", "Unknown"
+        raw_info = await pub_el.inner_text() if pub_el else ""
+        try:
+            parts = raw_info.split(" - ")
+            if len(parts) >= 2:
+                venue = parts[-2]
+                year_match = re.search(r'\b(19|20)\d{2}\b', venue)
+                if year_match: year = year_match.group(0)
+        except: pass
+
+        items.append({
+            "title": await title_el.inner_text(),
+            "url": await link_el.get_attribute("href"),
+            "venue": venue,
+            "year": year
+        })
+    return items
+
+async def launch_browser(p, user_data_dir, proxy=None):
+    """ 启动一个持久化浏览器上下文 (保存登录状态)，返回 (context, 第一个页面) """
+    # 准备启动参数
+    launch_args = [
+        "--disable-blink-features=AutomationControlled", # 隐藏自动化特征
+        "--no-sandbox",
+        "--disable-infobars",
+        "--start-maximized" # 最大化窗口
+    ]
+
+    # 配置代理 (如果设置了)
+    proxy_config = {"server": proxy} if proxy else None
+
+    print(f"   📂 使用用户数据目录: {user_data_dir}" + (f" (代理 {proxy})" if proxy else ""))
+
+    # 使用 launch_persistent_context 启动一个持久化的浏览器上下文
+    # 这样可以保存你的登录状态 (Cookies)，减少验证码
+    context = await p.chromium.launch_persistent_context(
+        user_data_dir=user_data_dir,
+        headless=False,  # 必须为 False 才能看到界面
+        proxy=proxy_config,
+        args=launch_args,
+        viewport=None # 禁用默认视口大小，跟随窗口
+    )
+
+    # 获取第一个页面
+    page = context.pages[0] if context.pages else await context.new_page()
+
+    # 注入一段 JS 去除 webdriver 特征 (注入到上下文，详情页池中新开的页面同样生效)
+    await context.add_init_script("""
+        Object.defineProperty(navigator, 'webdriver', {
+            get: () => undefined
+        })
+    """)
+    return context, page
+
+async def open_scholar_home(page):
+    """ 打开 Google Scholar 首页，检查拦截与登录状态 """
+    try:
+        await page.goto("https://scholar.google.com", timeout=TIMEOUT_MS)
+
+        # 检测是否被拦截
+        if await check_google_captcha_blocking(page):
+            pass # 已经在函数里 wait for input 了
+
+        # 检查是否登录（可选）
+        if await page.query_selector("a#gs_hdr_act_s"):
+            print("   👉 提示: 你当前似乎【未登录】Google 账号。建议登录以获取更多搜索结果。")
+        else:
+            print("   👤 检测到已登录状态 (Cookies生效中)")
+
+    except Exception as e:
+        print(f"   ⚠️  访问警告: {e}")
+
 def run_multi_keyword_spider():
+    """ 同步入口: 在事件循环中运行异步爬虫 """
+    return asyncio.run(run_multi_keyword_spider_async())
+
+async def run_multi_keyword_spider_async():
     print(f"\n🚀 [阶段 1/3] 正在启动独立浏览器实例...")
     print(f"📋 待抓取关键词列表: {KEYWORDS}")
     
-    global_task_list = [] 
-    seen_urls = set()     
+    cache = CrawlCache(CACHE_FILE, CACHE_TTL_DAYS, CACHE_MAX_MB) if CACHE_FILE else None
+    checkpoint = CrawlCheckpoint(CHECKPOINT_FILE) if CHECKPOINT_FILE else None
+    restored_tasks = list(checkpoint.tasks) if checkpoint else []
+    global_task_list = []
+    # 全局去重集合: 所有搜索窗口共用 (同一个事件循环内判断和加入之间没有 await，不会重复)
+    seen_urls = {task['url'] for task in restored_tasks}
+    limiter = HostRateLimiter()
+    page_step = 20 if RESULTS_PER_PAGE >= 20 else 10
 
-    with sync_playwright() as p:
+    async with async_playwright() as p:
         # ==================== 修改部分：自动启动浏览器 ====================
         try:
-            # 准备启动参数
-            launch_args = [
-                "--disable-blink-features=AutomationControlled", # 隐藏自动化特征
-                "--no-sandbox",
-                "--disable-infobars",
-                "--start-maximized" # 最大化窗口
-            ]
-            
-            # 配置代理 (如果设置了)
-            proxy_config = {"server": PROXY_SERVER} if PROXY_SERVER else None
-
-            print(f"   📂 使用用户数据目录: {USER_DATA_DIR}")
-            
-            # 使用 launch_persistent_context 启动一个持久化的浏览器上下文
-            # 这样可以保存你的登录状态 (Cookies)，减少验证码
-            context = p.chromium.launch_persistent_context(
-                user_data_dir=USER_DATA_DIR,
-                headless=False,  # 必须为 False 才能看到界面
-                proxy=proxy_config,
-                args=launch_args,
-                viewport=None # 禁用默认视口大小，跟随窗口
-            )
-            
-            # 获取第一个页面
-            page = context.pages[0] if context.pages else context.new_page()
+            context, page = await launch_browser(p, USER_DATA_DIR, PROXY_SERVER)
             print("   ✅ 浏览器启动成功！")
-            
-            # 可以在这里注入一段 JS 去除 webdriver 特征
-            page.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                })
-            """)
-
         except Exception as e:
             print(f"   ❌ 启动失败: {e}")
+            if cache: cache.close()
+            if checkpoint: checkpoint.file.close()
             return []
+
+        # 额外的搜索窗口 (每个都有独立的用户数据目录、代理和限速器)，启动失败的直接跳过
+        searchers = [("主窗口", page, limiter)]
+        extra_contexts = []
+        for i, conf in enumerate(SEARCH_CONTEXTS[:len(KEYWORDS) - 1]):
+            name = f"窗口{i + 2}"
+            try:
+                extra_context, extra_page = await launch_browser(p, conf["user_data_dir"], conf.get("proxy"))
+            except Exception as e:
+                print(f"   ⚠️  {name} 启动失败，跳过: {e}")
+                continue
+            extra_contexts.append(extra_context)
+            searchers.append((name, extra_page, HostRateLimiter(name)))
         # ===============================================================
 
         # 2. 访问 Google Scholar
         print("   🔍 正在访问 Google Scholar...")
-        try:
-            page.goto("https://scholar.google.com", timeout=TIMEOUT_MS)
-            
-            # 检测是否被拦截
-            if check_google_captcha_blocking(page):
-                pass # 已经在函数里 wait for input 了
-            
-            # 检查是否登录（可选）
-            if page.query_selector("a#gs_hdr_act_s"):
-                print("   👉 提示: 你当前似乎【未登录】Google 账号。建议登录以获取更多搜索结果。")
-            else:
-                print("   👤 检测到已登录状态 (Cookies生效中)")
+        await asyncio.gather(*(open_scholar_home(search_page) for _, search_page, _ in searchers))
 
-        except Exception as e:
-            print(f"   ⚠️  访问警告: {e}")
+        # ============ 流水线: 列表采集 (生产者) 与详情抓取 (消费者) 同时进行 ============
+        # 列表页只用搜索窗口的 page，Scholar 翻页由限速器单独控速；详情页在主浏览器的页面池中并行抓取。
+        # 列表每产出一篇就送进有界队列，第一个关键词的详情不必等所有关键词翻页结束
+        print(f"\n🕵️  [子阶段 B] 详情抓取与列表采集并行启动 (页面池 {DETAIL_CONCURRENCY} 个, 单站默认并发 {DOMAIN_CONCURRENCY})...")
+        detail_queue = asyncio.Queue(maxsize=DETAIL_QUEUE_SIZE)
+        detail_job = asyncio.create_task(crawl_details(context, detail_queue, cache, checkpoint, limiter))
+
+        async def submit(task):
+            # 先占序号再等待入队，多个搜索窗口同时提交时序号不会重复
+            global_task_list.append(task)
+            await detail_queue.put((len(global_task_list) - 1, task))
 
         # ================= LOOP 1: 遍历所有关键词 (抓取列表) =================
-        print(f"\n🌊 [子阶段 A] 开始遍历关键词...")
-        
+        print(f"\n🌊 [子阶段 A] 开始遍历关键词 ({len(searchers)} 个搜索窗口, 每页 {page_step} 条)...")
+        keyword_queue = asyncio.Queue()
         for kw_index, keyword in enumerate(KEYWORDS):
-            print(f"\n   👉 ({kw_index+1}/{len(KEYWORDS)}) 正在搜索: [{keyword}]")
-            
-            current_kw_count = 0
-            current_offset = 0
-            
-            while current_kw_count < TARGET_COUNT_PER_KEYWORD:
-                list_url = f"https://scholar.google.com/scholar?q={keyword.replace(' ', '+')}&start={current_offset}"
+            keyword_queue.put_nowait((kw_index, keyword))
+
+        async def search_worker(name, search_page, search_limiter):
+            # 每个搜索窗口不断领取下一个关键词，直到关键词全部分配完
+            tag = f"[{name}] " if len(searchers) > 1 else ""
+            while not keyword_queue.empty():
+                kw_index, keyword = keyword_queue.get_nowait()
+                print(f"\n   👉 {tag}({kw_index+1}/{len(KEYWORDS)}) 正在搜索: [{keyword}]")
                 
-                retry = 0
-                while retry < 3:
-                    try:
-                        page.goto(list_url, timeout=TIMEOUT_MS)
-                        # 检测验证码
-                        if check_google_captcha_blocking(page):
-                            pass 
-                        page.wait_for_selector("div.gs_r", timeout=30000)
-                        break
-                    except:
-                        retry += 1
-                        time.sleep(3)
+                state = checkpoint.keywords.get(keyword, {}) if checkpoint else {}
+                if state.get("done"):
+                    print(f"      ⏭️  断点中已完成，跳过 ({state['count']} 篇)")
+                    continue
+                current_kw_count = state.get("count", 0)
+                current_offset = state.get("offset", 0)
+                load_failed = False
                 
-                cards = page.query_selector_all("div.gs_r.gs_or.gs_scl")
-                if not cards: 
-                    print("      ⚠️  未找到更多结果卡片，结束当前关键词搜索。")
-                    break
+                while current_kw_count < TARGET_COUNT_PER_KEYWORD:
+                    list_url = f"https://scholar.google.com/scholar?q={keyword.replace(' ', '+')}&start={current_offset}"
+                    if page_step == 20: list_url += "&num=20"
+                    
+                    page_items = cache.get(list_url) if cache else None
+                    from_cache = page_items is not None
+                    if not from_cache:
+                        page_items = await scrape_result_page(search_page, list_url, search_limiter)
+                        if page_items and cache: cache.put(list_url, page_items)
+                    if page_items is None:
+                        print(f"      ❌ {tag}[{keyword}] 列表页多次加载失败，结束当前关键词搜索 (下次运行从这一页续爬)。")
+                        load_failed = True
+                        break
+                    if not page_items: 
+                        print(f"      ⚠️  {tag}[{keyword}] 未找到更多结果卡片，结束当前关键词搜索。")
+                        break
 
-                exclude_ext = ('.pdf', '.gz', '.ps', '.zip')
-                
-                new_items_on_page = 0
-                for item in cards:
-                    if current_kw_count >= TARGET_COUNT_PER_KEYWORD: break
-                    link_el = item.query_selector("h3.gs_rt a")
-                    title_el = item.query_selector("h3.gs_rt")
-                    pub_el = item.query_selector("div.gs_a")
+                    exclude_ext = ('.pdf', '.gz', '.ps', '.zip')
                     
-                    if link_el and title_el:
-                        url = link_el.get_attribute("href")
+                    new_items = []
+                    for item in page_items:
+                        if current_kw_count >= TARGET_COUNT_PER_KEYWORD: break
+                        url = item['url']
                         if url and url.startswith("http") and not url.lower().endswith(exclude_ext):
                             if url in seen_urls: continue
                             seen_urls.add(url)
-                            
-                            venue, year = "Unknown", "Unknown"
-                            raw_info = pub_el.inner_text() if pub_el else ""
-                            try:
-                                parts = raw_info.split(" - ")
-                                if len(parts) >= 2:
-                                    venue = parts[-2]
-                                    year_match = re.search(r'\b(19|20)\d{2}\b', venue)
-                                    if year_match: year = year_match.group(0)
-                            except: pass
-                            
-                            global_task_list.append({
-                                "keyword": keyword,
-                                "title": title_el.inner_text(), 
-                                "url": url, 
-                                "venue": venue, 
-                                "year": year
-                            })
+                            new_items.append({"keyword": keyword, **item})
                             current_kw_count += 1
-                            new_items_on_page += 1
+                    new_items_on_page = len(new_items)
+                    # 先记断点再入队，保证每条详情记录在断点中都有对应的列表记录
+                    if checkpoint:
+                        checkpoint.log({"type": "list", "keyword": keyword, "offset": current_offset,
+                                        "next_offset": current_offset + page_step,
+                                        "count": current_kw_count, "items": new_items})
+                    for item in new_items:
+                        await submit(item)
 
-                print(f"      ---> 本页新增: {new_items_on_page} | 进度: {current_kw_count}/{TARGET_COUNT_PER_KEYWORD}")
-                current_offset += 10
-                if current_kw_count < TARGET_COUNT_PER_KEYWORD:
-                    sleep_time = random.uniform(3, 6)
-                    time.sleep(sleep_time)
-            
-            time.sleep(random.uniform(4, 8))
+                    print(f"      ---> {tag}[{keyword}] 本页新增: {new_items_on_page} | 进度: {current_kw_count}/{TARGET_COUNT_PER_KEYWORD}" + (" (缓存)" if from_cache else ""))
+                    current_offset += page_step
+                
+                # 翻页与换关键词之间的等待统一由限速器控制
+                if checkpoint and not load_failed: checkpoint.log({"type": "keyword_done", "keyword": keyword})
 
-        print(f"\n📋 列表采集完毕！共 {len(global_task_list)} 篇。")
+        async def produce():
+            # 断点中已采集的论文先进入队列 (已完成详情的会被直接跳过)
+            for task in restored_tasks:
+                await submit(task)
+            await asyncio.gather(*(search_worker(*searcher) for searcher in searchers))
 
-        # ================= LOOP 2: 遍历任务池 (抓取详情) =================
-        print(f"\n🕵️  [子阶段 B] 开始深度抓取详情...")
-        
-        final_results = []
-        
-        # 使用 tqdm 显示总进度
-        for index, task in enumerate(tqdm(global_task_list, desc="Deep Crawling")):
-            abstract, doi = "未找到", "未找到"
-            try:
-                page.goto(task['url'], timeout=45000, wait_until="domcontentloaded")
-                time.sleep(random.uniform(2.0, 4.0)) 
-                
-                if is_target_captcha(page):
-                    abstract = "验证码拦截 (已跳过)"
-                else:
-                    abstract, doi = extract_details(page, task['url'])
-            except Exception:
-                abstract = "访问异常"
-            
-            # 将结果加入列表
-            task_result = {**task, "doi": doi, "abstract": abstract}
-            final_results.append(task_result)
-
-            # 每爬 10 篇自动保存
-            if (index + 1) % 10 == 0:
-                try:
-                    with open(RAW_DATA_FILE, 'w', encoding='utf-8') as f:
-                        json.dump(final_results, f, ensure_ascii=False, indent=4)
-                except: pass
+        # 详情抓取异常退出后队列不再被消费，生产者会永远阻塞在 put 上:
+        # 两边一起等待，任一方出错就取消另一方并抛出异常 (断点保留，下次运行可续爬)
+        producer = asyncio.create_task(produce())
+        done, _ = await asyncio.wait({producer, detail_job}, return_when=asyncio.FIRST_COMPLETED)
+        if detail_job in done:
+            # 详情抓取要收到结束标记才会返回，提前结束只可能是出错
+            producer.cancel()
+            detail_job.result()
+        elif producer.exception():
+            detail_job.cancel()
+            raise producer.exception()
+
+        print(f"\n📋 列表采集完毕！共 {len(global_task_list)} 篇，等待剩余详情抓取完成...")
+
+        # ================= LOOP 2: 等待详情队列清空 =================
+        await detail_queue.put(None)
+        detail_results = await detail_job
+        final_results = [detail_results[i] for i in range(len(global_task_list))]
+        for _, _, search_limiter in searchers:
+            search_limiter.report()
 
         # 关闭浏览器上下文
-        try:
-            context.close()
-        except: pass
+        for c in [context] + extra_contexts:
+            try:
+                await c.close()
+            except: pass
+
+    if cache:
+        print(f"   🗄️  本地缓存: 命中 {cache.hits} 次, 未命中 {cache.misses} 次 ({CACHE_FILE})")
+        cache.close()
+    if checkpoint: checkpoint.finish()
         
     return final_results
 
@@ -396,25 +1310,89 @@ def run_multi_keyword_spider():
 #                  模块 3: 数据分析与翻译
 # ==============================================================================
 
+def build_frame(data_list):
+    """ 构建分析用 DataFrame: 期刊评级，重复值多的列转为 category """
+    df = pd.DataFrame(data_list)
+    df['Clean_Venue'], df['Level'] = rate_venues(df['venue'])
+    for col in ('keyword', 'year'):
+        if col in df.columns: df[col] = df[col].astype("category")
+    return df
+
+def year_keyword_counts(df):
+    """ 统计各个关键词的年份分布 (只统计四位数年份) """
+    valid = df[df['year'].astype(str).str.fullmatch(r'\d{4}')]
+    return valid.groupby(['year', 'keyword'], observed=True).size().unstack(fill_value=0)
+
+def iter_records(data):
+    """ 逐条产出原始记录 (dict)；DataFrame 中的缺失值转为 None """
+    if isinstance(data, list):
+        yield from data
+        return
+    cols = list(data.columns)
+    for row in data.itertuples(index=False, name=None):
+        yield {c: (None if v is None or v != v else v) for c, v in zip(cols, row)}
+
+def write_jsonl(path, records):
+    """ 紧凑 JSONL: 每行一篇论文，逐条写出，不需要先在内存中拼出整个 JSON """
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write('\n')
+
+def write_excel_streaming(path, df, cols):
+    """ openpyxl write-only 模式: 每行追加后即写入临时文件，不在内存中构建整个工作簿 """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    header = []
+    for name in cols:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    ws.append(header)
+    for row in df[cols].itertuples(index=False, name=None):
+        ws.append([None if v != v else v for v in row])   # NaN 写为空单元格
+    wb.save(path)
+
+def export_extra(df, formats):
+    """ 按 EXTRA_EXPORTS 额外导出 csv / parquet，返回成功写出的文件路径 """
+    base = os.path.splitext(REPORT_FILE)[0]
+    paths = []
+    for fmt in formats:
+        path = f"{base}.{fmt}"
+        try:
+            if fmt == "csv": df.to_csv(path, index=False, encoding='utf-8-sig')   # 带 BOM，Excel 直接打开不乱码
+            elif fmt == "parquet": df.to_parquet(path, index=False)
+            else:
+                print(f"   ⚠️  未知导出格式: {fmt}，已跳过")
+                continue
+        except ImportError:
+            print(f"   ⚠️  {fmt} 导出需要安装 pyarrow，已跳过")
+            continue
+        paths.append(path)
+    return paths
+
 def run_analyzer_module(data_list):
     print(f"\n📊 [阶段 2/3] 启动数据处理与翻译...")
     
-    if not data_list:
+    if data_list is None or len(data_list) == 0:
         print("❌ 没有数据可供分析！")
         return
 
-    df = pd.DataFrame(data_list)
-    
     # 1. 评级
     print("   🏷️  正在进行期刊分级...")
-    df[['Clean_Venue', 'Level']] = df['venue'].apply(lambda x: pd.Series(rate_venue(x)))
+    df = build_frame(data_list)
 
-    # 2. 翻译 (带进度条)
-    print("   🌍 正在翻译标题与摘要 (调用 Google API)...")
+    # 2. 翻译 (标题与摘要一起批量翻译，带进度条)
+    print(f"   🌍 正在翻译标题与摘要 (后端: {TRANSLATE_BACKEND}, 并发 {TRANSLATE_WORKERS})...")
     # 如果没有配置代理，且国内网络环境差，这里可能会报错
-    tqdm.pandas(desc="Translating")
-    df['标题(中文)'] = df['title'].progress_apply(lambda x: translate_text(x))
-    df['摘要(中文)'] = df['abstract'].progress_apply(lambda x: translate_text(x))
+    engine = TranslationEngine()
+    titles, abstracts = df['title'].tolist(), df['abstract'].tolist()
+    translated = engine.translate_many(titles + abstracts)
+    df['标题(中文)'] = translated[:len(titles)]
+    df['摘要(中文)'] = translated[len(titles):]
+    if engine.memory_hits:
+        print(f"   🧠 翻译记忆命中 {engine.memory_hits} 条，无需重新翻译")
+    engine.close()
 
     # 3. 整理列顺序
     cols = ['keyword', 'title', '标题(中文)', 'Level', 'Clean_Venue', 'year', 'doi', 'url', 'abstract', '摘要(中文)']
@@ -422,13 +1400,15 @@ def run_analyzer_module(data_list):
     
     # 4. 保存
     try:
-        # 保存原始 JSON
-        with open(RAW_DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data_list, f, ensure_ascii=False, indent=4)
+        # 保存原始数据 (JSONL)
+        write_jsonl(RAW_DATA_FILE, iter_records(data_list))
             
         # 保存 Excel
-        df[final_cols].to_excel(REPORT_FILE, index=False)
-        print(f"   💾 数据已保存:\n      -> Excel: {REPORT_FILE}\n      -> JSON:  {RAW_DATA_FILE}")
+        if EXCEL_STREAMING: write_excel_streaming(REPORT_FILE, df, final_cols)
+        else: df[final_cols].to_excel(REPORT_FILE, index=False)
+        print(f"   💾 数据已保存:\n      -> Excel: {REPORT_FILE}\n      -> JSONL: {RAW_DATA_FILE}")
+        for path in export_extra(df[final_cols], EXTRA_EXPORTS):
+            print(f"      -> {os.path.splitext(path)[1][1:].upper()}:   {path}")
     except Exception as e:
         print(f"   ❌ 保存失败: {e}")
 
@@ -437,9 +1417,9 @@ def run_analyzer_module(data_list):
         if not df.empty:
             plt.figure(figsize=(12, 6))
             # 统计各个关键词的年份分布
-            df_filtered = df[df['year'].astype(str).str.match(r'^\d{4}$')]
-            if not df_filtered.empty:
-                df_filtered.groupby(['year', 'keyword']).size().unstack().plot(kind='bar', stacked=True)
+            counts = year_keyword_counts(df)
+            if not counts.empty:
+                counts.plot(kind='bar', stacked=True)
                 plt.title('Paper Count by Year & Keyword')
                 plt.savefig(CHART_FILE)
                 print(f"   📊 统计图表已生成: {CHART_FILE}")
@@ -459,8 +1439,17 @@ if __name__ == "__main__":
     # 1. 执行爬虫 (列表 -> 详情)
     raw_data = run_multi_keyword_spider()
     
-    # 2. 执行分析 (翻译 -> 报表)
-    if raw_data:
+    # 2. 合并进论文库
+    if raw_data and STORE_FILE:
+        store = PaperStore(STORE_FILE)
+        added, updated = store.upsert(raw_data)
+        print(f"\n🗃️  论文库: 新增 {added} 篇, 更新 {updated} 篇, 共 {store.count()} 篇 ({STORE_FILE})")
+        if REPORT_FROM_STORE:
+            raw_data = store.query(keywords=KEYWORDS)
+        store.close()
+
+    # 3. 执行分析 (翻译 -> 报表)
+    if raw_data is not None and len(raw_data):
         run_analyzer_module(raw_data)
     
     print("\n🎉🎉🎉 全流程任务完成！")
\ No newline at end of file
@@ -0,0 +1,184 @@
+import os
+import re
+import gc
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import subprocess
+import importlib.util
+
+import pandas as pd
+
+# ==============================================================================
+#                 Scholar 分析模块性能基准 (python 2-benchmark.py [名称...])
+# ==============================================================================
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_pipeline():
+    """ 1-research_pipeline.py 文件名不是合法模块名, 这里按路径加载 """
+    spec = importlib.util.spec_from_file_location("pipeline", os.path.join(SCRIPT_DIR, "1-research_pipeline.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+pipeline = load_pipeline()
+
+def timed(func, *args, repeat=3):
+    """ 取多次运行中的最短耗时 """
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def make_synthetic_records(count, seed=0):
+    """ 生成类似多关键词爬取结果的记录 (venue 文本覆盖各个评级和清洗分支) """
+    rng = random.Random(seed)
+    keywords = ["Few-shot learning", "Supervised Contrastive Learning", "Prompt Tuning", "5G Core Network",
+                "Threat Detection", "Traffic Classification", "Encrypted Traffic Analysis", "Prompt-based Learning"]
+    venues = ["IEEE Transactions on Information Forensics and Security", "ACM Transactions on Privacy",
+              "Nature Communications", "Science Advances", "Proceedings of the IEEE/CVF CVPR",
+              "Advances in NeurIPS", "Proceedings of the AAAI Conference", "arXiv preprint arXiv:2101.00001",
+              "Computer Networks", "IEEE Access", "Springer LNCS", "Journal of Network and Computer Applications"]
+    records = []
+    for i in range(count):
+        year = str(rng.randint(2010, 2025)) if rng.random() < 0.9 else "Unknown"
+        venue = rng.choice(venues)
+        shape = rng.random()
+        if shape < 0.6: venue = f"{venue}, {year}"
+        elif shape < 0.8: venue = f"J Smith, A Lee - {venue}, {year} - example.org"
+        elif shape < 0.95: venue = f"{venue} - {year}"
+        else: venue = rng.choice([None, "Unknown", 2020])
+        records.append({"keyword": rng.choice(keywords), "title": f"Paper {i}", "url": f"https://example.org/p/{i}",
+                        "venue": venue, "year": year, "doi": "", "abstract": "x" * rng.randint(100, 1500)})
+    return records
+
+# ================= 1. 期刊分级与年份统计 =================
+
+def legacy_rate_venue(venue_text):
+    """ 旧实现: 逐行字符串判断 """
+    if not isinstance(venue_text, str): return "未知", "未知"
+    venue_lower = venue_text.lower()
+    clean_name = venue_text
+    try:
+        parts = venue_text.split(" - ")
+        if len(parts) >= 2:
+            clean_name = parts[-2]
+            clean_name = re.sub(r'\d{4}', '', clean_name).strip().strip(',')
+    except: pass
+
+    level = "普通"
+    if "ieee trans" in venue_lower or "acm trans" in venue_lower: level = "顶刊 (Trans)"
+    elif "nature" in venue_lower or "science" in venue_lower: level = "神刊"
+    elif any(x in venue_lower for x in ["cvpr", "iccv", "eccv", "neurips", "icml", "aaai"]): level = "顶会 (CCF A)"
+    elif "arxiv" in venue_lower: level = "预印本 (ArXiv)"
+
+    return clean_name, level
+
+def legacy_analyze(records):
+    """ 旧实现: 每行 apply 生成一个 Series，再过滤年份分组 """
+    df = pd.DataFrame(records)
+    df[['Clean_Venue', 'Level']] = df['venue'].apply(lambda x: pd.Series(legacy_rate_venue(x)))
+    df_filtered = df[df['year'].astype(str).str.match(r'^\d{4}$')]
+    return df, df_filtered.groupby(['year', 'keyword']).size().unstack()
+
+def vectorized_analyze(records):
+    df = pipeline.build_frame(records)
+    return df, pipeline.year_keyword_counts(df)
+
+def bench_venue(count=100000):
+    records = make_synthetic_records(count)
+    t_old, (df_old, counts_old) = timed(legacy_analyze, records, repeat=1)
+    t_new, (df_new, counts_new) = timed(vectorized_analyze, records)
+    assert df_new['Clean_Venue'].astype(object).tolist() == df_old['Clean_Venue'].tolist()
+    assert df_new['Level'].astype(object).tolist() == df_old['Level'].tolist()
+    assert counts_new.to_numpy().sum() == counts_old.fillna(0).to_numpy().sum()
+    cols = ['keyword', 'year', 'Clean_Venue', 'Level']
+    mem_old = df_old[cols].memory_usage(deep=True).sum()
+    mem_new = df_new[cols].memory_usage(deep=True).sum()
+    print(f"🏷️  期刊分级 + 年份统计 ({count} 条记录)")
+    print(f"   - 旧实现 (逐行 apply) : {t_old * 1000:8.1f} ms, 分类列 {mem_old / 1048576:6.1f} MB")
+    print(f"   - 向量化规则表        : {t_new * 1000:8.1f} ms, 分类列 {mem_new / 1048576:6.1f} MB")
+
+# ================= 2. 报表导出 =================
+
+REPORT_COLS = ['keyword', 'title', 'Level', 'Clean_Venue', 'year', 'doi', 'url', 'abstract']
+
+def proc_status_kb(field):
+    """ 读取进程内存 (KB): VmRSS 当前常驻内存, VmHWM 常驻内存峰值。
+    Linux 读 /proc/self/status (不用 ru_maxrss: 它会继承 fork 出子进程的父进程峰值)；
+    没有 /proc 时 (Windows / macOS) 依次退回 psutil、resource.getrusage """
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status", encoding='utf-8') as f:
+            for line in f:
+                if line.startswith(field + ":"): return int(line.split()[1])
+        return 0
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        # Windows 提供 peak_wset 峰值工作集；其他平台没有峰值字段，只能取当前值
+        return (getattr(info, "peak_wset", info.rss) if field == "VmHWM" else info.rss) // 1024
+    except ImportError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        print("⚠️  无法读取进程内存: 请安装 psutil (pip install psutil)")
+        return 0
+    # 子进程由 subprocess 以 exec 启动，不会继承父进程峰值；macOS 单位是字节，Linux 是 KB
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def export_worker(mode, count):
+    """ 在独立子进程中执行一种导出方式，打印耗时、导出期间 RSS 峰值与其相对导出前的增量 (KB) """
+    records = make_synthetic_records(count)
+    df = pipeline.build_frame(records)
+    out_dir = tempfile.mkdtemp(prefix="scholar_bench_export_")
+    gc.collect()
+    before = proc_status_kb("VmRSS")
+    start = time.perf_counter()
+    if mode == "legacy":
+        with open(os.path.join(out_dir, "data.json"), 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=4)
+        df[REPORT_COLS].to_excel(os.path.join(out_dir, "report.xlsx"), index=False)
+    else:
+        pipeline.write_jsonl(os.path.join(out_dir, "data.jsonl"), pipeline.iter_records(records))
+        pipeline.write_excel_streaming(os.path.join(out_dir, "report.xlsx"), df, REPORT_COLS)
+    elapsed = time.perf_counter() - start
+    peak = proc_status_kb("VmHWM")
+    shutil.rmtree(out_dir, ignore_errors=True)
+    print(elapsed, peak, peak - before)
+
+def bench_export(count=50000):
+    results = {}
+    for mode in ("legacy", "streaming"):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--export-worker", mode, str(count)],
+                             capture_output=True, text=True, check=True).stdout.split()
+        results[mode] = float(out[-3]), int(out[-2]) / 1024, int(out[-1]) / 1024
+    print(f"💾 报表导出 ({count} 条记录, JSON + Excel)")
+    for mode, label in (("legacy", "旧实现 (indent JSON + to_excel)"), ("streaming", "JSONL + write-only Excel     ")):
+        elapsed, peak, growth = results[mode]
+        print(f"   - {label}: {elapsed * 1000:8.1f} ms, 峰值 RSS {peak:7.1f} MB (导出期间 +{growth:6.1f} MB)")
+
+# ================= 入口 =================
+
+BENCHMARKS = {
+    "venue": bench_venue,
+    "export": bench_export,
+}
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--export-worker"]:
+        export_worker(sys.argv[2], int(sys.argv[3]))
+        sys.exit(0)
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"❌ 未知基准: {name}。可用: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
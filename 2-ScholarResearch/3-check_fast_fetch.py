@@ -0,0 +1,122 @@
+import os
+import sys
+import threading
+import functools
+import http.server
+import importlib.util
+
+# ==============================================================================
+#        免浏览器快速通道回归检查 (python 3-check_fast_fetch.py)
+#        用本地 http.server 提供 fixtures/ 下的页面，不访问外网
+# ==============================================================================
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(SCRIPT_DIR, "fixtures")
+
+def load_pipeline():
+    """ 1-research_pipeline.py 文件名不是合法模块名, 这里按路径加载 """
+    spec = importlib.util.spec_from_file_location("pipeline", os.path.join(SCRIPT_DIR, "1-research_pipeline.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+pipeline = load_pipeline()
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+class FixtureHandler(http.server.SimpleHTTPRequestHandler):
+    """ 静态提供 fixtures/；not_found.html 按真实网站的 404 页面返回 (带页面内容, 状态码 404) """
+    def do_GET(self):
+        if self.path == "/not_found.html":
+            body = read_fixture("not_found.html").encode('utf-8')
+            self.send_response(404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        super().do_GET()
+
+    def log_message(self, *args): pass
+
+def start_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(FixtureHandler, directory=FIXTURE_DIR))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/"
+
+# ================= 1. 验证页识别 =================
+
+def check_challenge_pattern():
+    assert pipeline.CHALLENGE_PATTERN.search(read_fixture("cloudflare_challenge.html"))
+    assert pipeline.CHALLENGE_PATTERN.search('<form action="https://www.google.com/sorry/index" method="post">')
+    assert pipeline.CHALLENGE_PATTERN.search("<title>Security CAPTCHA</title>")
+    for name in ("citation_meta.html", "arxiv_abstract.html", "description_only.html", "not_found.html"):
+        assert not pipeline.CHALLENGE_PATTERN.search(read_fixture(name)), name
+
+# ================= 2. HTML 解析 =================
+
+def check_meta_parser():
+    parser = pipeline.MetaTagParser(pipeline.FAST_SELECTORS["arxiv.org"])
+    parser.feed(read_fixture("arxiv_abstract.html"))
+    text = " ".join("".join(parser.text).split())
+    # 嵌套的同名标签不会提前结束截取，第二个匹配元素被忽略
+    assert text.startswith("Abstract:Prompt-based learning adapts"), text
+    assert "network threat detection" in text and "Nested quotes stay inside" in text, text
+    assert text.endswith("consistent gains."), text
+    assert "second abstract" not in text, text
+    assert parser.meta["citation_arxiv_id"] == "2301.00001"
+    assert parser.meta["og:description"] == "Short."
+
+    parser = pipeline.MetaTagParser()
+    parser.feed(read_fixture("citation_meta.html"))
+    assert parser.meta["citation_doi"] == "10.1109/TIFS.2023.3262121"
+    assert "&amp;" not in parser.meta["citation_abstract"] and " & " in parser.meta["citation_abstract"]
+    assert parser.text == []
+
+# ================= 3. 快速抓取 =================
+
+def check_fetch_details_fast(base):
+    abstract, doi = pipeline.fetch_details_fast(base + "citation_meta.html")
+    assert doi == "10.1109/TIFS.2023.3262121", doi
+    assert abstract.startswith("We propose a few-shot method") and " & " in abstract, abstract
+
+    # 本地服务器不是 arxiv.org，借用它的截取规则验证正文元素这条路径
+    pipeline.FAST_SELECTORS["127.0.0.1"] = pipeline.FAST_SELECTORS["arxiv.org"]
+    try:
+        abstract, doi = pipeline.fetch_details_fast(base + "arxiv_abstract.html")
+    finally:
+        del pipeline.FAST_SELECTORS["127.0.0.1"]
+    assert doi == "", doi
+    assert "Prompt-based learning adapts" in abstract and "second abstract" not in abstract, abstract
+
+    abstract, doi = pipeline.fetch_details_fast(base + "description_only.html")
+    assert doi == "", doi
+    assert abstract.startswith("This paper studies supervised contrastive learning"), abstract
+
+    # 验证页、404 页面 (即使带有 meta 描述) 和不存在的文件都交给浏览器兜底
+    for name in ("cloudflare_challenge.html", "not_found.html", "missing.html"):
+        result = pipeline.fetch_details_fast(base + name)
+        assert result is None, (name, result)
+
+# ================= 入口 =================
+
+if __name__ == "__main__":
+    pipeline.PROXIES = None         # 本地服务器不走代理
+    server, base = start_server()
+    checks = [
+        ("CHALLENGE_PATTERN", check_challenge_pattern),
+        ("MetaTagParser", check_meta_parser),
+        ("fetch_details_fast", lambda: check_fetch_details_fast(base)),
+    ]
+    failed = 0
+    for name, check in checks:
+        try:
+            check()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    server.shutdown()
+    sys.exit(1 if failed else 0)